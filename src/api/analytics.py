@@ -1,47 +1,128 @@
-from fastapi import APIRouter
-from src.api.depends import SessionDep, CurrentUserDep
+from typing import Optional
+import asyncio
+import os
+from fastapi import APIRouter, Query, Request
+from src.api.depends import ReadSessionDep, CurrentUserDep
+from src.db.database import read_session, wrote_recently
 from src.db.crud.analytics import (
     get_patent_statistics_by_author,
     get_patent_statistics_by_year,
     get_patent_statistics_by_type,
-    get_patent_activity_report
+    get_patent_activity_report,
+    get_summary_freshness,
+    stats_by_author_year,
+    stats_by_type_year,
+    patent_expirations,
+    SUMMARY_VIEWS
 )
 
 router = APIRouter()
 
+YearFrom = Query(None, ge=1, le=9998)
+YearTo = Query(None, ge=1, le=9998)
+
+ANALYTICS_DASHBOARD_CONCURRENCY = int(os.getenv("ANALYTICS_DASHBOARD_CONCURRENCY", 3))
+
+# Shared by all dashboard requests of the worker, so they can not take the whole pool
+_dashboard_slots = asyncio.Semaphore(ANALYTICS_DASHBOARD_CONCURRENCY)
+
+
+def _author_data(stats) -> list[dict]:
+    return [{"author": row[0], "patent_count": row[1]} for row in stats]
+
+
+def _year_data(stats) -> list[dict]:
+    return [{"year": int(row[0]) if row[0] else None, "patent_count": row[1]} for row in stats]
+
+
+def _type_data(stats) -> list[dict]:
+    return [{"type_id": row[0], "patent_count": row[1]} for row in stats]
+
 
 @router.get("/by-author")
-async def get_statistics_by_author(session: SessionDep, current_user: CurrentUserDep):
-    """Get statistics by author (requires authentication)"""
-    stats = await get_patent_statistics_by_author(session)
+async def get_statistics_by_author(
+    session: ReadSessionDep,
+    current_user: CurrentUserDep,
+    year_from: Optional[int] = YearFrom,
+    year_to: Optional[int] = YearTo
+):
+    """Get statistics by author, optionally for issue years year_from..year_to (requires authentication)"""
+    stats = await get_patent_statistics_by_author(session, year_from, year_to)
     return {
         "type": "author_statistics",
-        "data": [{"author": row[0], "patent_count": row[1]} for row in stats]
+        "data": _author_data(stats),
+        "freshness": await get_summary_freshness(session, [stats_by_author_year.name])
     }
 
 
 @router.get("/by-year")
-async def get_statistics_by_year(session: SessionDep, current_user: CurrentUserDep):
-    """Get statistics by year (requires authentication)"""
-    stats = await get_patent_statistics_by_year(session)
+async def get_statistics_by_year(
+    session: ReadSessionDep,
+    current_user: CurrentUserDep,
+    year_from: Optional[int] = YearFrom,
+    year_to: Optional[int] = YearTo
+):
+    """Get statistics by year, optionally for years year_from..year_to (requires authentication)"""
+    stats = await get_patent_statistics_by_year(session, year_from, year_to)
     return {
         "type": "year_statistics",
-        "data": [{"year": int(row[0]) if row[0] else None, "patent_count": row[1]} for row in stats]
+        "data": _year_data(stats),
+        "freshness": await get_summary_freshness(session, [stats_by_type_year.name])
     }
 
 
 @router.get("/by-type")
-async def get_statistics_by_type(session: SessionDep, current_user: CurrentUserDep):
-    """Get statistics by type (requires authentication)"""
-    stats = await get_patent_statistics_by_type(session)
+async def get_statistics_by_type(
+    session: ReadSessionDep,
+    current_user: CurrentUserDep,
+    year_from: Optional[int] = YearFrom,
+    year_to: Optional[int] = YearTo
+):
+    """Get statistics by type, optionally for issue years year_from..year_to (requires authentication)"""
+    stats = await get_patent_statistics_by_type(session, year_from, year_to)
     return {
         "type": "type_statistics",
-        "data": [{"type_id": row[0], "patent_count": row[1]} for row in stats]
+        "data": _type_data(stats),
+        "freshness": await get_summary_freshness(session, [stats_by_type_year.name])
     }
 
 
 @router.get("/activity-report")
-async def get_activity_report(session: SessionDep, current_user: CurrentUserDep):
+async def get_activity_report(session: ReadSessionDep, current_user: CurrentUserDep):
     """Get patent activity report (requires authentication)"""
     report = await get_patent_activity_report(session)
-    return report
+    return {**report, "freshness": await get_summary_freshness(session, [patent_expirations.name])}
+
+
+async def _on_own_session(request: Request, query, *args):
+    async with _dashboard_slots:
+        async with read_session(wrote_recently(request)) as session:
+            return await query(session, *args)
+
+
+@router.get("/dashboard")
+async def get_dashboard(
+    request: Request,
+    current_user: CurrentUserDep,
+    year_from: Optional[int] = YearFrom,
+    year_to: Optional[int] = YearTo
+):
+    """
+    All statistics in one response, queried concurrently on separate pooled sessions
+    (requires authentication)
+    """
+    by_author, by_year, by_type, report, freshness = await asyncio.gather(
+        _on_own_session(request, get_patent_statistics_by_author, year_from, year_to),
+        _on_own_session(request, get_patent_statistics_by_year, year_from, year_to),
+        _on_own_session(request, get_patent_statistics_by_type, year_from, year_to),
+        _on_own_session(request, get_patent_activity_report),
+        _on_own_session(request, get_summary_freshness, SUMMARY_VIEWS),
+    )
+    return {
+        "type": "dashboard",
+        "by_author": _author_data(by_author),
+        "by_year": _year_data(by_year),
+        "by_type": _type_data(by_type),
+        "activity_report": report,
+        "freshness": freshness
+    }
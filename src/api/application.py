@@ -1,30 +1,62 @@
-from fastapi import APIRouter, HTTPException
-from src.api.depends import SessionDep, CurrentUserDep, EmployeeUserDep
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from src.api.depends import (
+    SessionDep, ReadSessionDep, CurrentUserDep, EmployeeUserDep, PaginationDep, ApplicationFiltersDep
+)
 from src.schemas.patent import Application, ApplicationCreate, Status
 from src.db.crud.application import (
     get_application, get_applications, create_application,
-    update_application, delete_application, get_applications_by_status
+    update_application, delete_application, get_applications_by_status,
+    stream_applications, APPLICATION_COLUMNS
 )
+from src.db.database import read_session, wrote_recently, DB_STREAM_FETCH_SIZE, DB_STREAM_MAX_FETCH_SIZE
+from src.core.streaming import encode_rows, export_media_type
 
 router = APIRouter()
 
 
 @router.get("/", response_model=list[Application])
 async def list_applications(
-    session: SessionDep,
+    session: ReadSessionDep,
+    current_user: CurrentUserDep,
+    pagination: PaginationDep,
+    filters: ApplicationFiltersDep
+):
+    """
+    Get list of applications (requires authentication)
+    Filters: status_id, employee_id, author_id, submission_date_from/_to. Sort: id, submission_date
+    """
+    applications = await get_applications(
+        session, pagination.skip, pagination.limit, pagination.after, filters
+    )
+    return pagination.page(applications, filters.sort)
+
+
+@router.get("/export")
+async def export_applications(
+    request: Request,
     current_user: CurrentUserDep,
-    skip: int = 0,
-    limit: int = 100
+    filters: ApplicationFiltersDep,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    fetch_size: int = Query(DB_STREAM_FETCH_SIZE, ge=1, le=DB_STREAM_MAX_FETCH_SIZE)
 ):
-    """Get list of applications (requires authentication)"""
-    applications = await get_applications(session, skip, limit)
-    return applications
+    """Stream applications as NDJSON or CSV, with the same filters as the list (requires authentication)"""
+    async def partitions():
+        async with read_session(wrote_recently(request)) as session:
+            async for rows in stream_applications(session, fetch_size, filters):
+                yield rows
+
+    return StreamingResponse(
+        encode_rows(partitions(), APPLICATION_COLUMNS, format),
+        media_type=export_media_type(format)
+    )
 
 
 @router.get("/{application_id}", response_model=Application)
 async def get_application_details(
     application_id: int,
-    session: SessionDep,
+    session: ReadSessionDep,
     current_user: CurrentUserDep
 ):
     """Get application details by ID (requires authentication)"""
@@ -37,12 +69,15 @@ async def get_application_details(
 @router.get("/status/{status_id}", response_model=list[Application])
 async def get_applications_with_status(
     status_id: int,
-    session: SessionDep,
-    current_user: CurrentUserDep
+    session: ReadSessionDep,
+    current_user: CurrentUserDep,
+    pagination: PaginationDep
 ):
     """Get applications by status (requires authentication)"""
-    applications = await get_applications_by_status(session, status_id)
-    return applications
+    applications = await get_applications_by_status(
+        session, status_id, pagination.skip, pagination.limit, pagination.after
+    )
+    return pagination.page(applications)
 
 
 @router.post("/", response_model=Application)
@@ -1,21 +1,28 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, Response, status
 from datetime import timedelta
-from src.api.depends import SessionDep, CurrentUserDep
+import logging
+import math
+from typing import Optional
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from src.api.depends import SessionDep, CurrentUserDep, EmployeeUserDep
 from src.schemas.patent import (
     UserRegister, UserLogin, TokenResponse, TokenRefresh, UserResponse
 )
 from src.db.crud.user import (
-    get_user_by_username, get_user_by_email, create_user, get_user_by_id
-)
-from src.db.crud.references import (
-    get_employee, get_author, get_position, 
-    create_employee_internal, create_author_internal
+    get_auth_profile, register_user, RegistrationConflict,
+    bulk_register_users, USER_BULK_BATCH_SIZE
 )
+from src.db.crud.token import revoke_token
+from src.core.throttle import claim_login_attempt, record_login_success
+from src.core.streaming import iter_lines, iter_records, batched, stream_format
 from src.core.security import (
-    hash_password, verify_password, create_access_token, create_refresh_token,
-    verify_token
+    hash_password_async, verify_password_async, create_access_token, create_refresh_token,
+    verify_token, get_jwks, JWKS_MAX_AGE, PasswordHasherBusy
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
@@ -25,92 +32,68 @@ async def health_check():
     return {"status": "ok", "message": "Patent API is running"}
 
 
+@router.get("/.well-known/jwks.json")
+async def jwks(response: Response):
+    """Public keys for verifying access tokens without calling this API"""
+    response.headers["Cache-Control"] = f"public, max-age={JWKS_MAX_AGE}"
+    return get_jwks()
+
+
+def _registration_error(registration: UserRegister) -> Optional[str]:
+    if registration.user_type not in ["employee", "author"]:
+        return "user_type must be 'employee' or 'author'"
+    if not registration.full_name:
+        return "full_name is required"
+    if registration.user_type == "employee" and not registration.position_id:
+        return "position_id is required for employees"
+    return None
+
+
 @router.post("/register", response_model=TokenResponse)
 async def register(
     registration: UserRegister,
     session: SessionDep
 ):
     """Register new user (employee or author)"""
-    existing_user = await get_user_by_username(session, registration.username)
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
-    
-    existing_email = await get_user_by_email(session, registration.email)
-    if existing_email:
+    error = _registration_error(registration)
+    if error:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
+            detail=error
         )
 
-    if registration.user_type not in ["employee", "author"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="user_type must be 'employee' or 'author'"
-        )
-    
+    hashed_password = await hash_password_async(registration.password)
 
-    if not registration.full_name:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="full_name is required"
-        )
-    
-    employee_id = None
-    author_id = None
-    position_name = None
-    
-    if registration.user_type == "employee":
-        if not registration.position_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="position_id is required for employees"
-            )
-        
-
-        position = await get_position(session, registration.position_id)
-        if not position:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Position not found"
-            )
-        position_name = position.name
-
-        employee = await create_employee_internal(
+    try:
+        new_user = await register_user(
             session,
+            email=registration.email,
+            username=registration.username,
+            hashed_password=hashed_password,
+            user_type=registration.user_type,
             full_name=registration.full_name,
+            position_id=registration.position_id,
             employment_date=registration.employment_date,
-            phone_number=registration.phone_number,
-            position_id=registration.position_id
+            phone_number=registration.phone_number
         )
-        employee_id = employee.id
-        
-    else:  
-        author = await create_author_internal(
-            session,
-            full_name=registration.full_name
+    except RegistrationConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if not new_user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Position not found"
         )
-        author_id = author.id
-    
-    new_user = await create_user(
-        session=session,
-        email=registration.email,
-        username=registration.username,
-        password=registration.password,
-        user_type=registration.user_type,
-        employee_id=employee_id,
-        author_id=author_id
-    )
 
     access_token = create_access_token(
         user_id=new_user.id,
         username=new_user.username,
         user_type=new_user.user_type,
-        position_name=position_name,
-        employee_id=employee_id,
-        author_id=author_id
+        position_name=new_user.position_name,
+        employee_id=new_user.employee_id,
+        author_id=new_user.author_id
     )
     
     refresh_token = create_refresh_token(new_user.id, new_user.username)
@@ -125,13 +108,73 @@ async def register(
     )
 
 
+@router.post("/users/bulk")
+async def bulk_register(
+    request: Request,
+    session: SessionDep,
+    current_user: EmployeeUserDep
+):
+    """
+    Provision users from a JSONL or CSV body of UserRegister records (employees only)
+    The body is streamed and processed in batches, returns a per-row report
+    """
+    fmt = stream_format(request.headers.get("content-type"))
+    results = []
+    row_number = 0
+    records = iter_records(iter_lines(request.stream()), fmt)
+    async for batch in batched(records, USER_BULK_BATCH_SIZE):
+        valid = []
+        for record, error in batch:
+            row_number += 1
+            if error is None:
+                try:
+                    registration = UserRegister(**record)
+                    error = _registration_error(registration)
+                except ValidationError as e:
+                    error = "; ".join(err["msg"] for err in e.errors())
+            if error:
+                results.append({"row": row_number, "error": error})
+            else:
+                valid.append((row_number, registration))
+
+        if valid:
+            # Earlier batches are committed, so a failing batch is reported instead of failing the request
+            try:
+                created = await bulk_register_users(session, [r.dict() for _, r in valid])
+            except PasswordHasherBusy:
+                created = [{"error": "Server is busy, batch not processed"}] * len(valid)
+            except SQLAlchemyError:
+                logger.exception("Bulk registration batch failed")
+                await session.rollback()
+                created = [{"error": "Database error, batch not processed"}] * len(valid)
+            for (row, r), outcome in zip(valid, created):
+                results.append({"row": row, "username": r.username, **outcome})
+
+    results.sort(key=lambda item: item["row"])
+    return {
+        "created": sum(1 for item in results if "user_id" in item),
+        "failed": sum(1 for item in results if "error" in item),
+        "results": results
+    }
+
+
 @router.post("/login", response_model=TokenResponse)
 async def login(
     credentials: UserLogin,
+    request: Request,
     session: SessionDep
 ):
     """Login with username and password"""
-    user = await get_user_by_username(session, credentials.username)
+    client_ip = request.client.host if request.client else None
+    retry_after = await claim_login_attempt(credentials.username, client_ip)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+    user = await get_auth_profile(session, username=credentials.username)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -139,7 +182,7 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not verify_password(credentials.password, user.hashed_password):
+    if not await verify_password_async(credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
@@ -152,16 +195,13 @@ async def login(
             detail="User account is deactivated"
         )
     
-    position_name = None
-    if user.user_type == "employee" and user.employee:
-        if user.employee.position:
-            position_name = user.employee.position.name
-    
+    await record_login_success(credentials.username, client_ip)
+
     access_token = create_access_token(
         user_id=user.id,
         username=user.username,
         user_type=user.user_type,
-        position_name=position_name,
+        position_name=user.position_name,
         employee_id=user.employee_id,
         author_id=user.author_id
     )
@@ -185,39 +225,40 @@ async def refresh_access_token(
 ):
     """
     Refresh access token using refresh token
+    The refresh token is rotated: the old one is revoked and a new one is returned
     """
-    token_data = verify_token(refresh_request.refresh_token)
-    if not token_data:
+    token_data = verify_token(refresh_request.refresh_token, token_type="refresh")
+    if not token_data or not token_data.jti:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid refresh token",
         )
     
-    user = await get_user_by_id(session, token_data.user_id)
+    user = await get_auth_profile(session, user_id=token_data.user_id)
     if not user or not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found or inactive"
         )
-    
-    position_name = None
-    if user.user_type == "employee" and user.employee:
-        if user.employee.position:
-            position_name = user.employee.position.name
+
+    if not await revoke_token(session, token_data.jti, token_data.exp):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+        )
     
     access_token = create_access_token(
         user_id=user.id,
         username=user.username,
-        email=user.email,
         user_type=user.user_type,
-        position_name=position_name,
+        position_name=user.position_name,
         employee_id=user.employee_id,
         author_id=user.author_id
     )
     
     return TokenResponse(
         access_token=access_token,
-        refresh_token=refresh_request.refresh_token,
+        refresh_token=create_refresh_token(user.id, user.username),
         token_type="bearer",
         user_id=user.id,
         username=user.username,
@@ -231,7 +272,7 @@ async def get_current_user_info(
     session: SessionDep
 ):
     """Get current user information from JWT token"""
-    user = await get_user_by_id(session, current_user.user_id)
+    user = await get_auth_profile(session, user_id=current_user.user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -249,7 +290,18 @@ async def get_current_user_info(
 
 
 @router.post("/logout")
-async def logout(current_user: CurrentUserDep):
+async def logout(
+    current_user: CurrentUserDep,
+    session: SessionDep,
+    refresh_request: Optional[TokenRefresh] = None
+):
+    """Revoke current access token and, if given, the refresh token"""
+    if current_user.jti:
+        await revoke_token(session, current_user.jti, current_user.exp)
+    if refresh_request:
+        refresh_data = verify_token(refresh_request.refresh_token, token_type="refresh")
+        if refresh_data and refresh_data.jti and refresh_data.user_id == current_user.user_id:
+            await revoke_token(session, refresh_data.jti, refresh_data.exp)
     return {"message": f"User {current_user.username} logged out successfully"}
 
 
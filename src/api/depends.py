@@ -1,12 +1,15 @@
 from typing import Annotated, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from src.db.database import getSession
+from src.db.database import getSession, getReadSession
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.core.security import verify_token, extract_token_from_header, TokenData
-from src.db.crud.user import get_user_by_id
+from src.db.crud.user import is_user_active
+from src.db.crud.pagination import next_cursor
+from src.db.crud.filters import Filters, PATENT_FILTERS, APPLICATION_FILTERS
 
 SessionDep = Annotated[AsyncSession, Depends(getSession)]
+ReadSessionDep = Annotated[AsyncSession, Depends(getReadSession)]
 oauth2 = HTTPBearer()
 TokenDep = Annotated[HTTPAuthorizationCredentials, Depends(oauth2)]
 
@@ -33,8 +36,7 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = await get_user_by_id(session, token_data.user_id)
-    if not user or not user.is_active:
+    if not await is_user_active(session, token_data.user_id):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not active",
@@ -68,6 +70,38 @@ async def get_author_user(
     return current_user
 
 
+class Pagination:
+    """
+    skip/limit/after query parameters
+    page() sets X-Next-Cursor to the cursor of the following page, if there is one
+    """
+
+    def __init__(self, response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None):
+        self.response = response
+        self.skip = skip
+        self.limit = limit
+        self.after = after
+
+    def page(self, items, sort: Optional[str] = None):
+        cursor = next_cursor(items, self.limit, sort)
+        if cursor:
+            self.response.headers["X-Next-Cursor"] = cursor
+        return items
+
+
+PaginationDep = Annotated[Pagination, Depends()]
+
+
+def get_patent_filters(request: Request) -> Filters:
+    return PATENT_FILTERS.parse(request.query_params)
+
+
+def get_application_filters(request: Request) -> Filters:
+    return APPLICATION_FILTERS.parse(request.query_params)
+
+
+PatentFiltersDep = Annotated[Filters, Depends(get_patent_filters)]
+ApplicationFiltersDep = Annotated[Filters, Depends(get_application_filters)]
 CurrentUserDep = Annotated[TokenData, Depends(get_current_user)]
 EmployeeUserDep = Annotated[TokenData, Depends(get_employee_user)]
 AuthorUserDep = Annotated[TokenData, Depends(get_author_user)]
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends
+from src.api.depends import get_employee_user
+from src.core.security import get_password_hash_metrics, get_token_cache_metrics
+from src.db.crud.user import get_user_status_cache_metrics
+from src.db.crud.analytics import get_analytics_cache_metrics
+from src.db.database import all_pool_metrics
+
+# Employees only, like the other administrative endpoints
+router = APIRouter(dependencies=[Depends(get_employee_user)])
+
+
+@router.get("/password-hash")
+async def password_hash_metrics():
+    """Password hashing pool metrics"""
+    return get_password_hash_metrics()
+
+
+@router.get("/token-cache")
+async def token_cache_metrics():
+    """Verified token cache metrics"""
+    return get_token_cache_metrics()
+
+
+@router.get("/user-status-cache")
+async def user_status_cache_metrics():
+    """Active user cache metrics"""
+    return get_user_status_cache_metrics()
+
+
+@router.get("/analytics-cache")
+async def analytics_cache_metrics():
+    """Analytics result cache metrics, hit ratios per endpoint"""
+    return get_analytics_cache_metrics()
+
+
+@router.get("/db-pool")
+async def db_pool_metrics():
+    """Database connection pool metrics"""
+    return all_pool_metrics()
@@ -1,11 +1,19 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
-from src.api.depends import SessionDep, CurrentUserDep
-from src.schemas.patent import Patent, PatentBase
+from typing import Literal
+import json
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+from src.api.depends import SessionDep, ReadSessionDep, CurrentUserDep, PaginationDep, PatentFiltersDep
+from src.schemas.patent import Patent, PatentBase, PatentSearchResult
 from src.db.crud.patent import (
     get_patent, get_patents, create_patent,
     update_patent, delete_patent, get_expired_patents,
-    get_patents_by_owner
+    get_patents_by_owner, stream_patents, PATENT_COLUMNS,
+    bulk_create_patents, PATENT_BULK_BATCH_SIZE, PATENT_BULK_MAX_BATCH_SIZE, search_patents
+)
+from src.db.database import read_session, wrote_recently, DB_STREAM_FETCH_SIZE, DB_STREAM_MAX_FETCH_SIZE
+from src.core.streaming import (
+    encode_rows, export_media_type, iter_lines, iter_records, iter_objects, batched
 )
 
 router = APIRouter()
@@ -13,19 +21,54 @@ router = APIRouter()
 
 @router.get("/", response_model=list[Patent])
 async def list_patents(
-    session: SessionDep,
+    session: ReadSessionDep,
+    current_user: CurrentUserDep,
+    pagination: PaginationDep,
+    filters: PatentFiltersDep
+):
+    """
+    Get list of patents (requires authentication)
+    Filters: status_id, patent_type_id, rights_holder_id, author_id, issue_date_from/_to,
+    expiration_date_from/_to. Sort: id, issue_date, expiration_date
+    """
+    patents = await get_patents(session, pagination.skip, pagination.limit, pagination.after, filters)
+    return pagination.page(patents, filters.sort)
+
+
+@router.get("/owner/{owner_id}", response_model=list[Patent])
+async def list_patents_by_owner(
+    owner_id: int,
+    session: ReadSessionDep,
+    current_user: CurrentUserDep,
+    pagination: PaginationDep,
+    filters: PatentFiltersDep
+):
+    """Get patents of a rights holder, with the same filters as the list (requires authentication)"""
+    patents = await get_patents_by_owner(
+        session, owner_id, pagination.skip, pagination.limit, pagination.after, filters
+    )
+    return pagination.page(patents, filters.sort)
+
+
+@router.get("/search", response_model=list[PatentSearchResult])
+async def search(
+    session: ReadSessionDep,
     current_user: CurrentUserDep,
-    skip: int = 0,
-    limit: int = 100
+    pagination: PaginationDep,
+    q: str = Query(..., min_length=1, max_length=500)
 ):
-    """Get list of patents (requires authentication)"""
-    patents = await get_patents(session, skip, limit)
-    return patents
+    """Search patents by title and description, best matches first (requires authentication)"""
+    rows = await search_patents(session, q, pagination.skip, pagination.limit, pagination.after)
+    patents = []
+    for patent, rank, snippet in rows:
+        patent.rank, patent.snippet = rank, snippet
+        patents.append(patent)
+    return pagination.page(patents, sort="rank")
 
 
 @router.get("/expired", response_class=JSONResponse)
 async def get_expired(
-    session: SessionDep,
+    session: ReadSessionDep,
     current_user: CurrentUserDep
 ):
     """Get list of expired patents (requires authentication)"""
@@ -55,10 +98,30 @@ async def get_expired(
     return [_serialize(p) for p in expired_patents]
 
 
+@router.get("/export")
+async def export_patents(
+    request: Request,
+    current_user: CurrentUserDep,
+    filters: PatentFiltersDep,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    fetch_size: int = Query(DB_STREAM_FETCH_SIZE, ge=1, le=DB_STREAM_MAX_FETCH_SIZE)
+):
+    """Stream patents as NDJSON or CSV, with the same filters as the list (requires authentication)"""
+    async def partitions():
+        async with read_session(wrote_recently(request)) as session:
+            async for rows in stream_patents(session, fetch_size, filters):
+                yield rows
+
+    return StreamingResponse(
+        encode_rows(partitions(), PATENT_COLUMNS, format),
+        media_type=export_media_type(format)
+    )
+
+
 @router.get("/{patent_id}", response_model=Patent)
 async def get_patent_details(
     patent_id: int,
-    session: SessionDep,
+    session: ReadSessionDep,
     current_user: CurrentUserDep
 ):
     """Get patent details by ID (requires authentication)"""
@@ -80,6 +143,54 @@ async def create_new_patent(
     return db_patent
 
 
+@router.post("/bulk")
+async def bulk_create(
+    request: Request,
+    session: SessionDep,
+    current_user: CurrentUserDep,
+    batch_size: int = Query(PATENT_BULK_BATCH_SIZE, ge=1, le=PATENT_BULK_MAX_BATCH_SIZE)
+):
+    """
+    Create patents from a JSON array or an NDJSON stream of records (requires authentication)
+    Records are validated and inserted in batches, one transaction per batch
+    """
+    if "ndjson" in request.headers.get("content-type", ""):
+        records = iter_records(iter_lines(request.stream()), "ndjson")
+    else:
+        try:
+            items = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        records = iter_objects(items)
+
+    results = []
+    row_number = 0
+    async for batch in batched(records, batch_size):
+        valid = []
+        for record, error in batch:
+            row_number += 1
+            if error is None:
+                try:
+                    valid.append((row_number, PatentBase(**record).dict()))
+                    continue
+                except ValidationError as e:
+                    error = "; ".join(err["msg"] for err in e.errors())
+            results.append({"row": row_number, "error": error})
+
+        if valid:
+            created = await bulk_create_patents(session, [data for _, data in valid])
+            results.extend({"row": row, **outcome} for (row, _), outcome in zip(valid, created))
+
+    results.sort(key=lambda item: item["row"])
+    return {
+        "created": sum(1 for item in results if "id" in item),
+        "failed": sum(1 for item in results if "error" in item),
+        "results": results
+    }
+
+
 @router.put("/{patent_id}", response_model=Patent)
 async def update_patent_details(
     patent_id: int,
@@ -1,32 +1,53 @@
-from fastapi import APIRouter, HTTPException
-from src.api.depends import SessionDep, CurrentUserDep
+import os
+from fastapi import APIRouter, HTTPException, Query, Response
+from src.api.depends import SessionDep, ReadSessionDep, CurrentUserDep, PaginationDep
 from src.schemas.patent import (
     Position, Author, AuthorBase,
     RightsHolder, RightsHolderBase,
     Status, StatusBase,
     PatentType, PatentTypeBase,
-    Employee, EmployeeBase
+    Employee, EmployeeBase,
+    Suggestion
 )
 from src.db.crud.references import (
     get_employee, get_employees, create_employee, update_employee,
     get_author, get_authors, create_author,
     get_rights_holder, get_rights_holders, create_rights_holder,
     get_status, get_statuses, create_status,
-    get_patent_type, get_patent_types, create_patent_type
+    get_patent_type, get_patent_types, create_patent_type,
+    suggest_employees, suggest_authors, suggest_rights_holders
 )
 
+SUGGEST_MAX_AGE = int(os.getenv("SUGGEST_MAX_AGE", 60))
+
 router = APIRouter()
 
+SuggestQuery = Query(..., min_length=1, max_length=200)
+SuggestLimit = Query(10, ge=1, le=50)
+
 
 @router.get("/employees/", response_model=list[Employee])
-async def list_employees(session: SessionDep, current_user: CurrentUserDep, skip: int = 0, limit: int = 100):
+async def list_employees(session: ReadSessionDep, current_user: CurrentUserDep, pagination: PaginationDep):
     """Get list of employees (requires authentication)"""
-    employees = await get_employees(session, skip, limit)
-    return employees
+    employees = await get_employees(session, pagination.skip, pagination.limit, pagination.after)
+    return pagination.page(employees)
+
+
+@router.get("/employees/suggest", response_model=list[Suggestion])
+async def suggest_employee_names(
+    response: Response,
+    session: ReadSessionDep,
+    current_user: CurrentUserDep,
+    q: str = SuggestQuery,
+    limit: int = SuggestLimit
+):
+    """Employees with names similar to q, for typeahead (requires authentication)"""
+    response.headers["Cache-Control"] = f"private, max-age={SUGGEST_MAX_AGE}"
+    return await suggest_employees(session, q, limit)
 
 
 @router.get("/employees/{employee_id}", response_model=Employee)
-async def get_employee_details(employee_id: int, session: SessionDep, current_user: CurrentUserDep):
+async def get_employee_details(employee_id: int, session: ReadSessionDep, current_user: CurrentUserDep):
     """Get employee details (requires authentication)"""
     employee = await get_employee(session, employee_id)
     if not employee:
@@ -51,14 +72,26 @@ async def update_employee_details(employee_id: int, employee: EmployeeBase, sess
 
 
 @router.get("/authors/", response_model=list[Author])
-async def list_authors(session: SessionDep, skip: int = 0, limit: int = 100):
+async def list_authors(session: ReadSessionDep, pagination: PaginationDep):
     """Get list of authors"""
-    authors = await get_authors(session, skip, limit)
-    return authors
+    authors = await get_authors(session, pagination.skip, pagination.limit, pagination.after)
+    return pagination.page(authors)
+
+
+@router.get("/authors/suggest", response_model=list[Suggestion])
+async def suggest_author_names(
+    response: Response,
+    session: ReadSessionDep,
+    q: str = SuggestQuery,
+    limit: int = SuggestLimit
+):
+    """Authors with names similar to q, for typeahead"""
+    response.headers["Cache-Control"] = f"public, max-age={SUGGEST_MAX_AGE}"
+    return await suggest_authors(session, q, limit)
 
 
 @router.get("/authors/{author_id}", response_model=Author)
-async def get_author_details(author_id: int, session: SessionDep):
+async def get_author_details(author_id: int, session: ReadSessionDep):
     """Get author details"""
     author = await get_author(session, author_id)
     if not author:
@@ -73,14 +106,26 @@ async def create_new_author(author: AuthorBase, session: SessionDep):
     return db_author
 
 @router.get("/rightsholders/", response_model=list[RightsHolder])
-async def list_rightsholders(session: SessionDep, skip: int = 0, limit: int = 100):
+async def list_rightsholders(session: ReadSessionDep, pagination: PaginationDep):
     """Get list of rights holders"""
-    rightsholders = await get_rights_holders(session, skip, limit)
-    return rightsholders
+    rightsholders = await get_rights_holders(session, pagination.skip, pagination.limit, pagination.after)
+    return pagination.page(rightsholders)
+
+
+@router.get("/rightsholders/suggest", response_model=list[Suggestion])
+async def suggest_rightsholder_names(
+    response: Response,
+    session: ReadSessionDep,
+    q: str = SuggestQuery,
+    limit: int = SuggestLimit
+):
+    """Rights holders with names similar to q, for typeahead"""
+    response.headers["Cache-Control"] = f"public, max-age={SUGGEST_MAX_AGE}"
+    return await suggest_rights_holders(session, q, limit)
 
 
 @router.get("/rightsholders/{holder_id}", response_model=RightsHolder)
-async def get_rightsholder_details(holder_id: int, session: SessionDep):
+async def get_rightsholder_details(holder_id: int, session: ReadSessionDep):
     """Get rights holder details"""
     rightsholder = await get_rights_holder(session, holder_id)
     if not rightsholder:
@@ -96,14 +141,14 @@ async def create_new_rightsholder(rightsholder: RightsHolderBase, session: Sessi
 
 
 @router.get("/statuses/", response_model=list[Status])
-async def list_statuses(session: SessionDep):
+async def list_statuses(session: ReadSessionDep):
     """Get list of statuses"""
     statuses = await get_statuses(session)
     return statuses
 
 
 @router.get("/statuses/{status_id}", response_model=Status)
-async def get_status_details(status_id: int, session: SessionDep):
+async def get_status_details(status_id: int, session: ReadSessionDep):
     """Get status details"""
     status = await get_status(session, status_id)
     if not status:
@@ -119,14 +164,14 @@ async def create_new_status(status: StatusBase, session: SessionDep):
 
 
 @router.get("/types/", response_model=list[PatentType])
-async def list_types(session: SessionDep):
+async def list_types(session: ReadSessionDep):
     """Get list of patent types"""
     types = await get_patent_types(session)
     return types
 
 
 @router.get("/types/{type_id}", response_model=PatentType)
-async def get_type_details(type_id: int, session: SessionDep):
+async def get_type_details(type_id: int, session: ReadSessionDep):
     """Get patent type details"""
     type_obj = await get_patent_type(session, type_id)
     if not type_obj:
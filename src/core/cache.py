@@ -0,0 +1,193 @@
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+import asyncio
+import json
+import sqlite3
+import time
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Small in-process map with per-entry expiry and LRU eviction"""
+
+    def __init__(self, ttl: float, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        if self.max_size <= 0:
+            return
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class SQLiteCacheStore:
+    """JSON values with expiry in a local SQLite file, shared by all workers on the host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM entries WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str, ttl: float):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+            conn.execute("INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)", (key, value, now + ttl))
+
+    def _clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+
+    async def get(self, key: str) -> Any:
+        raw = await asyncio.to_thread(self._get, key)
+        return _MISSING if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await asyncio.to_thread(self._set, key, json.dumps(value, default=str), ttl)
+
+    async def clear(self):
+        await asyncio.to_thread(self._clear)
+
+
+class ResultCache:
+    """
+    Results of async loaders, kept in a per-worker TTLCache and optionally in a shared store
+    Concurrent misses on one key wait for a single load. Entries of a named endpoint share
+    a TTL; invalidation drops everything, and loads that started before it are not stored
+    """
+
+    def __init__(self, ttls: dict[str, float], max_size: int = 1000, store: Optional[SQLiteCacheStore] = None):
+        self.ttls = ttls
+        self.store = store
+        self._local = TTLCache(ttl=0, max_size=max_size)
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._generation = 0
+        self._counts = {name: Counter(hits=0, shared_hits=0, coalesced=0, misses=0) for name in ttls}
+
+    async def get_or_load(self, name: str, args: tuple, load: Callable[[], Awaitable[Any]]) -> Any:
+        key = f"{name}:{json.dumps(args, default=str)}"
+        counts = self._counts[name]
+        while True:
+            value = self._local.get(key, _MISSING)
+            if value is not _MISSING:
+                counts["hits"] += 1
+                return value
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                break
+            try:
+                value = await asyncio.shield(in_flight)
+                counts["coalesced"] += 1
+                return value
+            except asyncio.CancelledError:
+                # The loading request went away, take over unless this one was cancelled too
+                if not in_flight.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._in_flight[key] = future
+        generation = self._generation
+        ttl = self.ttls[name]
+        try:
+            value = await self.store.get(key) if self.store else _MISSING
+            if value is not _MISSING:
+                counts["shared_hits"] += 1
+            else:
+                counts["misses"] += 1
+                value = await load()
+                if self.store and generation == self._generation:
+                    await self.store.set(key, value, ttl)
+            if generation == self._generation:
+                self._local.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def invalidate_local(self):
+        """Drop this worker's entries, loads in progress are not stored"""
+        self._generation += 1
+        self._local.clear()
+
+    async def invalidate(self):
+        self.invalidate_local()
+        if self.store:
+            await self.store.clear()
+
+    def stats(self) -> dict:
+        endpoints = {}
+        for name, counts in self._counts.items():
+            total = sum(counts.values())
+            served = total - counts["misses"]
+            endpoints[name] = {
+                **counts,
+                "ttl": self.ttls[name],
+                "hit_ratio": round(served / total, 4) if total else 0.0,
+            }
+        return {
+            "size": len(self._local),
+            "max_size": self._local.max_size,
+            "shared_store": self.store.path if self.store else None,
+            "endpoints": endpoints,
+        }
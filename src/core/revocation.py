@@ -0,0 +1,108 @@
+from typing import Iterable
+import hashlib
+import math
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", 100000))
+REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", 1e-6))
+# Other workers learn of a revocation by NOTIFY within milliseconds of the commit. With
+# DB_NOTIFY_ENABLED off, or while the listener is disconnected, only this rebuild brings them
+# up to date, so a revoked access token may still be accepted there for up to this many seconds
+REVOCATION_PRUNE_INTERVAL = int(os.getenv("REVOCATION_PRUNE_INTERVAL", 600))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(capacity, 1)
+        self.size = math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(round(self.size / self.capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationIndex:
+    """
+    In-memory set of revoked token ids backed by the RevokedToken table
+    Membership is a Bloom filter, so a check is O(1) with no query. False positives
+    happen at REVOCATION_BLOOM_ERROR_RATE and only force a new login. The filter can not
+    forget ids, so it is rebuilt from the table once expired rows are pruned
+    """
+
+    def __init__(self, capacity: int = REVOCATION_BLOOM_CAPACITY, error_rate: float = REVOCATION_BLOOM_ERROR_RATE):
+        self.error_rate = error_rate
+        self._filter = BloomFilter(capacity, error_rate)
+        self._added_during_rebuild = None
+
+    def add(self, jti: str):
+        if self._filter.count >= self._filter.capacity:
+            self._grow()
+        self._filter.add(jti)
+        if self._added_during_rebuild is not None:
+            self._added_during_rebuild.append(jti)
+
+    def start_rebuild(self):
+        """Remember ids added while the table is being read, so rebuild does not lose them"""
+        self._added_during_rebuild = []
+
+    def rebuild(self, jtis: Iterable[str]):
+        jtis = list(jtis) + (self._added_during_rebuild or [])
+        bloom = BloomFilter(max(REVOCATION_BLOOM_CAPACITY, len(jtis) * 2), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        self._filter = bloom
+        self._added_during_rebuild = None
+
+    def _grow(self):
+        # Bits can not be rehashed, keep the old filter merged into a bigger one until the next rebuild
+        old = self._filter
+        bigger = BloomFilter(old.capacity * 2, self.error_rate)
+        self._filter = _UnionFilter(bigger, old)
+
+    def __contains__(self, jti: str) -> bool:
+        return jti in self._filter
+
+    def __len__(self) -> int:
+        return self._filter.count
+
+
+class _UnionFilter:
+    def __init__(self, current: BloomFilter, previous):
+        self.current = current
+        self.previous = previous
+        self.capacity = current.capacity
+        self.count = previous.count + current.count
+
+    def add(self, item: str):
+        self.current.add(item)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return item in self.current or item in self.previous
+
+
+revoked_tokens = RevocationIndex()
+
+
+def is_revoked(jti: str) -> bool:
+    return jti in revoked_tokens
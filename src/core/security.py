@@ -1,28 +1,108 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
+import asyncio
+import hashlib
+import multiprocessing
 import os
+import time
+import uuid
 from dotenv import load_dotenv
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
 import bcrypt
 from pydantic import BaseModel
+from src.core.metrics import Histogram
+from src.core.revocation import is_revoked
 
 load_dotenv()
 
 
 SECRET_KEY = os.getenv("SECRET_KEY", "oleg")
-ALGORITHM = "HS256"
+ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR", "keys")
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID")
+JWKS_MAX_AGE = int(os.getenv("JWKS_MAX_AGE", 3600))
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 600))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
 
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 64))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 10))
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+
+
+def _load_signing_keys() -> Dict[str, str]:
+    """
+    Private keys for RS*/ES* signing, one PEM file per key named <kid>.pem
+    To rotate, add a new key and point JWT_ACTIVE_KID at it; the old key keeps
+    verifying until its tokens expire and is then removed from the directory
+    """
+    if ALGORITHM.startswith("HS"):
+        return {}
+    keys = {}
+    for name in sorted(os.listdir(JWT_KEYS_DIR)):
+        if name.endswith(".pem"):
+            with open(os.path.join(JWT_KEYS_DIR, name)) as f:
+                keys[name[:-len(".pem")]] = f.read()
+    if not keys:
+        raise RuntimeError(f"No signing keys found in {JWT_KEYS_DIR} for {ALGORITHM}")
+    return keys
+
+
+def _select_active_kid(keys: Dict[str, str], active_kid: Optional[str]) -> Optional[str]:
+    """Key that signs new tokens, checked at startup so a bad setting does not fail every login"""
+    if not keys:
+        if active_kid:
+            raise RuntimeError(f"JWT_ACTIVE_KID is set, but {ALGORITHM} signs with SECRET_KEY and uses no key files")
+        return None
+    if active_kid is None:
+        return max(keys)
+    if active_kid not in keys:
+        raise RuntimeError(
+            f"JWT_ACTIVE_KID {active_kid!r} has no key file {os.path.join(JWT_KEYS_DIR, active_kid + '.pem')}"
+        )
+    return active_kid
+
+
+_signing_keys = _load_signing_keys()
+_active_kid = _select_active_kid(_signing_keys, JWT_ACTIVE_KID)
+_public_keys = {kid: jwk.construct(pem, ALGORITHM).public_key() for kid, pem in _signing_keys.items()}
+
+
+def _encode_token(claims: Dict[str, Any]) -> str:
+    if _active_kid is None:
+        return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+    return jwt.encode(claims, _signing_keys[_active_kid], algorithm=ALGORITHM, headers={"kid": _active_kid})
+
+
+def _verification_key(token: str):
+    if _active_kid is None:
+        return SECRET_KEY
+    return _public_keys.get(jwt.get_unverified_header(token).get("kid"))
+
+
+def get_jwks() -> Dict[str, Any]:
+    """Public signing keys as a JSON Web Key Set, empty for HMAC algorithms"""
+    return {
+        "keys": [
+            {**key.to_dict(), "kid": kid, "use": "sig", "alg": ALGORITHM}
+            for kid, key in _public_keys.items()
+        ]
+    }
+
 
 class TokenData(BaseModel):
     user_id: int
     username: str
-    user_type: str  # employee или author
+    user_type: Optional[str] = None  # employee или author, пусто у refresh токена
     position_name: Optional[str] = None
     employee_id: Optional[int] = None
     author_id: Optional[int] = None
     exp: Optional[datetime] = None
+    jti: Optional[str] = None
+    token_type: str = "access"
 
 
 def hash_password(password: str) -> str:
@@ -40,6 +120,123 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return False
 
 
+class PasswordHasherBusy(Exception):
+    """Password hashing pool is saturated or did not answer in time"""
+
+
+_hash_executor: Optional[ProcessPoolExecutor] = None
+_hash_pending = 0
+_hash_rejected = 0
+_hash_timeouts = 0
+_hash_queue_wait = Histogram()
+_hash_time = Histogram()
+
+
+def _timed_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def _get_hash_executor() -> ProcessPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _hash_executor
+
+
+def _release_hash_slot():
+    global _hash_pending
+    _hash_pending -= 1
+
+
+def _call_in_loop(loop: asyncio.AbstractEventLoop, callback):
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        # The loop is closed, nothing is counting anymore
+        pass
+
+
+async def _run_in_hash_pool(func, *args, timeout: float = PASSWORD_HASH_TIMEOUT):
+    """
+    Run a bcrypt call in the process pool
+    At most PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE calls may be pending,
+    anything above that is rejected instead of piling up behind the workers
+    """
+    global _hash_pending, _hash_rejected, _hash_timeouts
+    if _hash_pending >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE:
+        _hash_rejected += 1
+        raise PasswordHasherBusy("Password hashing queue is full")
+
+    loop = asyncio.get_running_loop()
+    enqueued = time.perf_counter()
+    future = _get_hash_executor().submit(_timed_call, func, *args)
+    _hash_pending += 1
+    # A timed out call keeps its worker busy, the slot is freed only when the worker is done
+    future.add_done_callback(lambda _: _call_in_loop(loop, _release_hash_slot))
+    try:
+        result, elapsed = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+    except asyncio.TimeoutError:
+        _hash_timeouts += 1
+        raise PasswordHasherBusy("Password hashing timed out")
+
+    _hash_time.observe(elapsed)
+    _hash_queue_wait.observe(max(time.perf_counter() - enqueued - elapsed, 0.0))
+    return result
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_hash_pool(hash_password, password)
+
+
+def _hash_many(passwords: list[str]) -> list[str]:
+    return [hash_password(password) for password in passwords]
+
+
+async def hash_passwords_async(passwords: list[str]) -> list[str]:
+    """
+    Hash a batch of passwords across the whole pool
+    The batch is split into one chunk per worker so it takes PASSWORD_HASH_WORKERS queue slots
+    """
+    if not passwords:
+        return []
+    chunk_size = -(-len(passwords) // PASSWORD_HASH_WORKERS)
+    chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+    results = await asyncio.gather(*(
+        _run_in_hash_pool(_hash_many, chunk, timeout=PASSWORD_HASH_TIMEOUT * len(chunk))
+        for chunk in chunks
+    ))
+    return [hashed for chunk in results for hashed in chunk]
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+def get_password_hash_metrics() -> Dict[str, Any]:
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "queue_size": PASSWORD_HASH_QUEUE_SIZE,
+        "timeout": PASSWORD_HASH_TIMEOUT,
+        "pending": _hash_pending,
+        "rejected": _hash_rejected,
+        "timeouts": _hash_timeouts,
+        "queue_wait_seconds": _hash_queue_wait.snapshot(),
+        "hash_seconds": _hash_time.snapshot(),
+    }
+
+
+def shutdown_password_hasher():
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+
 def create_access_token(
     user_id: int,
     username: str,
@@ -56,6 +253,7 @@ def create_access_token(
         "position_name": position_name,
         "employee_id": employee_id,
         "author_id": author_id,
+        "jti": uuid.uuid4().hex,
     }
     
     if expires_delta:
@@ -64,7 +262,7 @@ def create_access_token(
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = _encode_token(to_encode)
     return encoded_jwt
 
 
@@ -72,17 +270,21 @@ def create_refresh_token(user_id: int, username: str) -> str:
     to_encode = {
         "user_id": user_id,
         "username": username,
-        "type": "refresh"
+        "type": "refresh",
+        "jti": uuid.uuid4().hex
     }
     expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = _encode_token(to_encode)
     return encoded_jwt
 
 
-def verify_token(token: str) -> Optional[TokenData]:
+def _decode_token(token: str) -> Optional[TokenData]:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        key = _verification_key(token)
+        if key is None:
+            return None
+        payload = jwt.decode(token, key, algorithms=[ALGORITHM])
         user_id: int = payload.get("user_id")
         username: str = payload.get("username")
         user_type: str = payload.get("user_type")
@@ -90,6 +292,8 @@ def verify_token(token: str) -> Optional[TokenData]:
         employee_id: Optional[int] = payload.get("employee_id")
         author_id: Optional[int] = payload.get("author_id")
         exp = payload.get("exp")
+        jti: Optional[str] = payload.get("jti")
+        token_type: str = payload.get("type", "access")
 
         if user_id is None or username is None:
             return None
@@ -101,12 +305,62 @@ def verify_token(token: str) -> Optional[TokenData]:
             position_name=position_name,
             employee_id=employee_id,
             author_id=author_id,
-            exp=datetime.utcfromtimestamp(exp) if isinstance(exp, (int, float)) else exp
+            exp=datetime.utcfromtimestamp(exp) if isinstance(exp, (int, float)) else exp,
+            jti=jti,
+            token_type=token_type
         )
     except JWTError:
         return None
 
 
+_token_cache: "OrderedDict[bytes, TokenData]" = OrderedDict()
+_token_cache_hits = 0
+_token_cache_misses = 0
+
+
+def verify_token(token: str, token_type: str = "access") -> Optional[TokenData]:
+    """
+    Verify JWT of the given type and return its claims, None if invalid or revoked
+    Verified tokens are kept in an LRU cache keyed by the token digest until they expire
+    """
+    global _token_cache_hits, _token_cache_misses
+    if TOKEN_CACHE_SIZE <= 0:
+        token_data = _decode_token(token)
+    else:
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        token_data = _token_cache.get(key)
+        if token_data is not None and token_data.exp is not None and token_data.exp <= datetime.utcnow():
+            del _token_cache[key]
+            token_data = None
+        if token_data is not None:
+            _token_cache.move_to_end(key)
+            _token_cache_hits += 1
+        else:
+            _token_cache_misses += 1
+            token_data = _decode_token(token)
+            if token_data is not None:
+                _token_cache[key] = token_data
+                if len(_token_cache) > TOKEN_CACHE_SIZE:
+                    _token_cache.popitem(last=False)
+
+    if token_data is None or token_data.token_type != token_type:
+        return None
+    if token_data.jti is not None and is_revoked(token_data.jti):
+        return None
+    return token_data
+
+
+def get_token_cache_metrics() -> Dict[str, Any]:
+    total = _token_cache_hits + _token_cache_misses
+    return {
+        "size": len(_token_cache),
+        "max_size": TOKEN_CACHE_SIZE,
+        "hits": _token_cache_hits,
+        "misses": _token_cache_misses,
+        "hit_ratio": round(_token_cache_hits / total, 4) if total else 0.0,
+    }
+
+
 def extract_token_from_header(authorization: Optional[str]) -> Optional[str]:
     if not authorization:
         return None
@@ -0,0 +1,119 @@
+from typing import AsyncIterator, Iterable, Optional, Sequence, Tuple
+import csv
+import io
+import json
+
+
+def _decode_line(line: bytes) -> Optional[str]:
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError:
+        return None
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Optional[str]]:
+    """
+    Split a byte stream into text lines without buffering the whole body
+    A line that is not valid UTF-8 comes out as None, iter_records reports it as a row error
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield _decode_line(line)
+    if buffer:
+        yield _decode_line(buffer)
+
+
+def parse_csv_line(line: str) -> list[str]:
+    return next(csv.reader([line]), [])
+
+
+async def iter_records(
+    lines: AsyncIterator[Optional[str]],
+    fmt: str
+) -> AsyncIterator[Tuple[Optional[dict], Optional[str]]]:
+    """
+    Parse NDJSON or CSV lines into (record, error) pairs
+    CSV needs a header line, empty CSV cells become None. Records must fit on one line
+    """
+    header = None
+    async for line in lines:
+        if line is None:
+            yield None, "Line is not valid UTF-8"
+            continue
+        if not line.strip():
+            continue
+        if fmt == "csv":
+            values = parse_csv_line(line)
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            if len(values) != len(header):
+                yield None, f"Expected {len(header)} columns, got {len(values)}"
+                continue
+            yield {key: (value if value != "" else None) for key, value in zip(header, values)}, None
+        else:
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield None, "Expected a JSON object"
+                continue
+            yield record, None
+
+
+async def iter_objects(items: Iterable) -> AsyncIterator[Tuple[Optional[dict], Optional[str]]]:
+    """(record, error) pairs for an already parsed JSON array"""
+    for item in items:
+        if isinstance(item, dict):
+            yield item, None
+        else:
+            yield None, "Expected a JSON object"
+
+
+async def batched(items: AsyncIterator, size: int) -> AsyncIterator[list]:
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_format(content_type: Optional[str]) -> str:
+    return "csv" if content_type and "csv" in content_type else "ndjson"
+
+
+def _json_default(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+async def encode_rows(
+    partitions: AsyncIterator[Sequence[dict]],
+    columns: Sequence[str],
+    fmt: str
+) -> AsyncIterator[str]:
+    """Encode batches of row mappings as NDJSON or CSV, one chunk per batch"""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue()
+        async for rows in partitions:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([row[column] for column in columns] for row in rows)
+            yield buffer.getvalue()
+    else:
+        async for rows in partitions:
+            yield "".join(json.dumps({column: row[column] for column in columns}, default=_json_default) + "\n" for row in rows)
+
+
+def export_media_type(fmt: str) -> str:
+    return "text/csv" if fmt == "csv" else "application/x-ndjson"
@@ -0,0 +1,177 @@
+from collections import defaultdict, deque
+from typing import Optional, Tuple
+import asyncio
+import os
+import sqlite3
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+LOGIN_THROTTLE_ENABLED = os.getenv("LOGIN_THROTTLE_ENABLED", "true").lower() in ("1", "true", "yes")
+LOGIN_THROTTLE_WINDOW_SECONDS = int(os.getenv("LOGIN_THROTTLE_WINDOW_SECONDS", 300))
+LOGIN_THROTTLE_MAX_PER_USERNAME = int(os.getenv("LOGIN_THROTTLE_MAX_PER_USERNAME", 5))
+LOGIN_THROTTLE_MAX_PER_IP = int(os.getenv("LOGIN_THROTTLE_MAX_PER_IP", 30))
+LOGIN_THROTTLE_BACKEND = os.getenv("LOGIN_THROTTLE_BACKEND", "memory")
+LOGIN_THROTTLE_SQLITE_PATH = os.getenv("LOGIN_THROTTLE_SQLITE_PATH", "login_throttle.sqlite3")
+
+
+class MemoryThrottleBackend:
+    """Per-worker attempt log"""
+
+    def __init__(self):
+        self._attempts: dict[str, deque] = defaultdict(deque)
+        self._adds = 0
+
+    def _prune(self, key: str, since: float) -> deque:
+        attempts = self._attempts[key]
+        while attempts and attempts[0] <= since:
+            attempts.popleft()
+        if not attempts:
+            del self._attempts[key]
+        return attempts
+
+    async def acquire(self, key: str, now: float, since: float, limit: int) -> Optional[float]:
+        # No await between the check and the append, so concurrent requests are counted one by one
+        attempts = self._prune(key, since) if key in self._attempts else ()
+        if len(attempts) >= limit:
+            return attempts[0]
+        self._attempts[key].append(now)
+        self._adds += 1
+        if self._adds % 1000 == 0:
+            for stale in list(self._attempts):
+                self._prune(stale, since)
+        return None
+
+    async def release(self, key: str):
+        attempts = self._attempts.get(key)
+        if attempts:
+            attempts.pop()
+            if not attempts:
+                del self._attempts[key]
+
+    async def reset(self, key: str):
+        self._attempts.pop(key, None)
+
+
+class SQLiteThrottleBackend:
+    """Attempt log in a local SQLite file, shared by all workers on the host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS attempts (key TEXT NOT NULL, ts REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_attempts_key_ts ON attempts (key, ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_attempts_ts ON attempts (ts)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _acquire(self, key: str, now: float, since: float, limit: int) -> Optional[float]:
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            # The write lock is taken up front, so check and insert are atomic across workers
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM attempts WHERE ts <= ?", (since,))
+            count, oldest = conn.execute(
+                "SELECT COUNT(*), MIN(ts) FROM attempts WHERE key = ?", (key,)
+            ).fetchone()
+            if count < limit:
+                conn.execute("INSERT INTO attempts (key, ts) VALUES (?, ?)", (key, now))
+                oldest = None
+            conn.execute("COMMIT")
+            return oldest
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _release(self, key: str):
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM attempts WHERE rowid = "
+                "(SELECT rowid FROM attempts WHERE key = ? ORDER BY ts DESC LIMIT 1)", (key,)
+            )
+
+    def _reset(self, key: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM attempts WHERE key = ?", (key,))
+
+    async def acquire(self, key: str, now: float, since: float, limit: int) -> Optional[float]:
+        return await asyncio.to_thread(self._acquire, key, now, since, limit)
+
+    async def release(self, key: str):
+        await asyncio.to_thread(self._release, key)
+
+    async def reset(self, key: str):
+        await asyncio.to_thread(self._reset, key)
+
+
+class SlidingWindowLimiter:
+    """Counts events per key over the last `window` seconds"""
+
+    def __init__(self, backend, window: int):
+        self.backend = backend
+        self.window = window
+
+    async def acquire(self, key: str, limit: int) -> Optional[float]:
+        """
+        Count an event for key unless it is at the limit, checked and counted in one step.
+        Returns seconds until key may try again when refused, None when counted
+        """
+        now = time.time()
+        oldest = await self.backend.acquire(key, now, now - self.window, limit)
+        if oldest is None:
+            return None
+        return max(oldest + self.window - now, 1.0)
+
+    async def release(self, key: str):
+        """Take back the latest counted event"""
+        await self.backend.release(key)
+
+    async def reset(self, key: str):
+        await self.backend.reset(key)
+
+
+def _create_backend():
+    if LOGIN_THROTTLE_BACKEND == "sqlite":
+        return SQLiteThrottleBackend(LOGIN_THROTTLE_SQLITE_PATH)
+    return MemoryThrottleBackend()
+
+
+login_limiter = SlidingWindowLimiter(_create_backend(), LOGIN_THROTTLE_WINDOW_SECONDS)
+
+
+async def claim_login_attempt(username: str, client_ip: Optional[str]) -> Optional[float]:
+    """
+    Count a login attempt before the password is verified. Returns seconds the client has
+    to wait when refused, None when the attempt may go ahead. Concurrent requests are counted
+    one by one, so a burst can not get more than the limit through to the password hash
+    """
+    if not LOGIN_THROTTLE_ENABLED:
+        return None
+    keys = [(f"user:{username}", LOGIN_THROTTLE_MAX_PER_USERNAME)]
+    if client_ip:
+        keys.append((f"ip:{client_ip}", LOGIN_THROTTLE_MAX_PER_IP))
+    counted = []
+    for key, limit in keys:
+        retry_after = await login_limiter.acquire(key, limit)
+        if retry_after is not None:
+            for claimed in counted:
+                await login_limiter.release(claimed)
+            return retry_after
+        counted.append(key)
+    return None
+
+
+async def record_login_success(username: str, client_ip: Optional[str]):
+    """Clear the username's attempts and take back this attempt from the client address"""
+    if not LOGIN_THROTTLE_ENABLED:
+        return
+    await login_limiter.reset(f"user:{username}")
+    if client_ip:
+        await login_limiter.release(f"ip:{client_ip}")
@@ -3,6 +3,7 @@ Patent Management System Database Schema
 PostgreSQL 12+
 Updated: 2025-12-01
 Includes User authentication with JWT tokens, Author-based applications
+Baseline of the migration history, later changes live in src/db/migrations
 */
 
 -- Table User (Authentication)
@@ -180,6 +181,17 @@ ALTER TABLE "PatentAuthor" ADD CONSTRAINT "FK_PatentAuthor_Patent" FOREIGN KEY (
 CREATE INDEX "IX_PatentAuthor_author_id" ON "PatentAuthor" ("author_id");
 CREATE INDEX "IX_PatentAuthor_patent_id" ON "PatentAuthor" ("patent_id");
 
+-- Table RevokedToken (jti of logged out access tokens and rotated refresh tokens)
+CREATE TABLE "RevokedToken"
+(
+  "jti" Character varying NOT NULL,
+  "expires_at" Timestamp NOT NULL
+)
+WITH (autovacuum_enabled=true);
+
+ALTER TABLE "RevokedToken" ADD CONSTRAINT "PK_RevokedToken" PRIMARY KEY ("jti");
+CREATE INDEX "IX_RevokedToken_expires_at" ON "RevokedToken" ("expires_at");
+
 INSERT INTO "Status" ("name") VALUES 
   ('Создан'),
   ('Черновик'),
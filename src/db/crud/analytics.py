@@ -1,67 +1,153 @@
+from typing import Optional
+import asyncio
+import functools
+import logging
+import os
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from src.models.models import Patent, Author, PatentAuthor, Application
+from sqlalchemy import select, update, func, table, column, text, Integer, String, Date
+from src.models.models import AnalyticsRefresh
+from src.core.cache import ResultCache, SQLiteCacheStore
+from src.db.database import engine
+from src.db.notify import listener, notify
 from datetime import date, datetime
 
+logger = logging.getLogger(__name__)
 
-async def get_patent_statistics_by_author(session: AsyncSession):
+ANALYTICS_REFRESH_INTERVAL = int(os.getenv("ANALYTICS_REFRESH_INTERVAL", 30))
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", 60))
+ANALYTICS_CACHE_TTLS = {
+    "by_author": float(os.getenv("ANALYTICS_CACHE_TTL_BY_AUTHOR", ANALYTICS_CACHE_TTL)),
+    "by_year": float(os.getenv("ANALYTICS_CACHE_TTL_BY_YEAR", ANALYTICS_CACHE_TTL)),
+    "by_type": float(os.getenv("ANALYTICS_CACHE_TTL_BY_TYPE", ANALYTICS_CACHE_TTL)),
+    "activity_report": float(os.getenv("ANALYTICS_CACHE_TTL_ACTIVITY_REPORT", ANALYTICS_CACHE_TTL)),
+}
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", 1000))
+ANALYTICS_CACHE_BACKEND = os.getenv("ANALYTICS_CACHE_BACKEND", "memory")  # memory или sqlite
+ANALYTICS_CACHE_SQLITE_PATH = os.getenv("ANALYTICS_CACHE_SQLITE_PATH", "analytics_cache.sqlite3")
+ANALYTICS_CACHE_CHANNEL = "analytics_cache"
+
+# Any constant works as long as nothing else takes the same advisory lock
+REFRESH_LOCK_ID = 0x616E6C74
+
+# Materialized views created by migration 0006, kept fresh by run_summary_refresher
+stats_by_type_year = table(
+    "PatentStatsByTypeYear",
+    column("patent_type_id", Integer), column("year", Integer), column("patent_count", Integer)
+)
+stats_by_author_year = table(
+    "PatentStatsByAuthorYear",
+    column("author", String), column("year", Integer), column("patent_count", Integer)
+)
+patent_expirations = table(
+    "PatentExpirations",
+    column("expiration_date", Date), column("patent_count", Integer)
+)
+SUMMARY_VIEWS = [stats_by_type_year.name, stats_by_author_year.name, patent_expirations.name]
+
+_analytics_cache = ResultCache(
+    ANALYTICS_CACHE_TTLS,
+    max_size=ANALYTICS_CACHE_SIZE,
+    store=SQLiteCacheStore(ANALYTICS_CACHE_SQLITE_PATH) if ANALYTICS_CACHE_BACKEND == "sqlite" else None
+)
+
+listener.subscribe(ANALYTICS_CACHE_CHANNEL, lambda payload: _analytics_cache.invalidate_local())
+
+
+async def notify_analytics_changed(session: AsyncSession):
+    """Tell other workers to drop cached analytics once session commits"""
+    await notify(session, ANALYTICS_CACHE_CHANNEL, "")
+
+
+async def invalidate_analytics_cache():
+    """Drop cached analytics in this worker and the shared store, call after commit"""
+    await _analytics_cache.invalidate()
+
+
+def get_analytics_cache_metrics():
+    return _analytics_cache.stats()
+
+
+def _cached(name: str):
+    """Serve the result from the analytics cache, keyed by the arguments after the session"""
+    def decorate(func):
+        @functools.wraps(func)
+        async def wrapper(session: AsyncSession, *args):
+            return await _analytics_cache.get_or_load(name, args, lambda: func(session, *args))
+        return wrapper
+    return decorate
+
+
+def _in_years(view, year_from: Optional[int] = None, year_to: Optional[int] = None) -> list:
+    clauses = []
+    if year_from is not None:
+        clauses.append(view.c.year >= year_from)
+    if year_to is not None:
+        clauses.append(view.c.year <= year_to)
+    return clauses
+
+
+def _total(view):
+    return func.coalesce(func.sum(view.c.patent_count), 0).cast(Integer)
+
+
+@_cached("by_author")
+async def get_patent_statistics_by_author(
+    session: AsyncSession, year_from: Optional[int] = None, year_to: Optional[int] = None
+):
+    view = stats_by_author_year
     result = await session.execute(
-        select(
-            Author.full_name,
-            func.count(Patent.id).label("patent_count")
-        )
-        .select_from(Author)
-        .join(Application, Application.author_id == Author.id)
-        .join(Patent, Patent.application_id == Application.id)
-        .group_by(Author.full_name)
+        select(view.c.author, _total(view).label("patent_count"))
+        .where(*_in_years(view, year_from, year_to))
+        .group_by(view.c.author)
     )
-    return result.all()
+    return [list(row) for row in result]
 
 
-async def get_patent_statistics_by_year(session: AsyncSession):
+@_cached("by_year")
+async def get_patent_statistics_by_year(
+    session: AsyncSession, year_from: Optional[int] = None, year_to: Optional[int] = None
+):
+    view = stats_by_type_year
     result = await session.execute(
-        select(
-            func.extract('year', Patent.issue_date).label("year"),
-            func.count(Patent.id).label("patent_count")
-        )
-        .where(Patent.issue_date.isnot(None))
-        .group_by(func.extract('year', Patent.issue_date))
+        select(view.c.year, _total(view).label("patent_count"))
+        .where(view.c.year.isnot(None), *_in_years(view, year_from, year_to))
+        .group_by(view.c.year)
+        .order_by(view.c.year)
     )
-    return result.all()
+    return [list(row) for row in result]
 
 
-async def get_patent_statistics_by_type(session: AsyncSession):
+@_cached("by_type")
+async def get_patent_statistics_by_type(
+    session: AsyncSession, year_from: Optional[int] = None, year_to: Optional[int] = None
+):
+    view = stats_by_type_year
     result = await session.execute(
-        select(
-            Patent.patent_type_id,
-            func.count(Patent.id).label("patent_count")
-        )
-        .group_by(Patent.patent_type_id)
+        select(view.c.patent_type_id, _total(view).label("patent_count"))
+        .where(*_in_years(view, year_from, year_to))
+        .group_by(view.c.patent_type_id)
     )
-    return result.all()
+    return [list(row) for row in result]
 
 
+@_cached("activity_report")
 async def get_patent_activity_report(session: AsyncSession):
     today = date.today()
-    
+    view = patent_expirations
     result = await session.execute(
         select(
-            func.count(Patent.id).label("total_patents"),
-            func.count(Patent.application_id).label("applications"),
+            _total(view).label("total_patents"),
+            func.coalesce(func.sum(view.c.patent_count).filter(view.c.expiration_date < today), 0)
+            .cast(Integer).label("expired_patents"),
         )
     )
-    
     stats = result.first()
-    
-    expired_result = await session.execute(
-        select(func.count(Patent.id)).where(Patent.expiration_date < today)
-    )
-    expired_count = expired_result.scalar()
-    
+
+    # Every patent belongs to exactly one application
     return {
-        "total_patents": stats[0] or 0,
-        "total_applications": stats[1] or 0,
-        "expired_patents": expired_count or 0
+        "total_patents": stats.total_patents,
+        "total_applications": stats.total_patents,
+        "expired_patents": stats.expired_patents
     }
 
 
@@ -72,3 +158,82 @@ async def get_processing_time_statistics(session: AsyncSession):
         )
     )
     return result.all()
+
+
+async def get_summary_freshness(session: AsyncSession, views: list[str]) -> dict:
+    """
+    How current the summaries behind a response are
+    age_seconds counts from the start of the oldest refresh; pending_changes is true when
+    rows changed since then and a refresh is due
+    """
+    result = await session.execute(
+        select(
+            func.min(AnalyticsRefresh.refreshed_at).label("refreshed_at"),
+            func.max(func.extract("epoch", func.localtimestamp() - AnalyticsRefresh.refreshed_at)).label("age"),
+            func.bool_or(AnalyticsRefresh.dirty).label("dirty"),
+        )
+        .where(AnalyticsRefresh.view_name.in_(views))
+    )
+    row = result.first()
+    return {
+        "refreshed_at": row.refreshed_at,
+        "age_seconds": round(float(row.age), 3) if row.age is not None else None,
+        "pending_changes": bool(row.dirty),
+    }
+
+
+async def refresh_summaries(force: bool = False) -> list[str]:
+    """
+    Refresh dirty summary views, or all of them with force. Returns the refreshed views
+    The flag is cleared before the refresh, so writes committed while it runs mark the
+    view dirty again. One worker refreshes at a time, others skip
+    """
+    refreshed = []
+    async with engine.connect() as conn:
+        if not await conn.scalar(select(func.pg_try_advisory_lock(REFRESH_LOCK_ID))):
+            await conn.rollback()
+            return refreshed
+        try:
+            await conn.commit()
+            for view in SUMMARY_VIEWS:
+                claim = update(AnalyticsRefresh).where(AnalyticsRefresh.view_name == view)
+                if not force:
+                    claim = claim.where(AnalyticsRefresh.dirty)
+                async with conn.begin():
+                    claimed = await conn.scalar(
+                        claim.values(dirty=False).returning(AnalyticsRefresh.view_name)
+                    )
+                if claimed is None:
+                    continue
+                try:
+                    async with conn.begin():
+                        await conn.execute(text(f'REFRESH MATERIALIZED VIEW CONCURRENTLY "{view}"'))
+                        await conn.execute(
+                            update(AnalyticsRefresh)
+                            .where(AnalyticsRefresh.view_name == view)
+                            .values(refreshed_at=func.localtimestamp())
+                        )
+                        await notify_analytics_changed(conn)
+                except Exception:
+                    # Give the claim back so the next run retries; conn may be broken, use another
+                    async with engine.begin() as retry:
+                        await retry.execute(
+                            update(AnalyticsRefresh).where(AnalyticsRefresh.view_name == view).values(dirty=True)
+                        )
+                    raise
+                refreshed.append(view)
+        finally:
+            await conn.execute(select(func.pg_advisory_unlock(REFRESH_LOCK_ID)))
+            await conn.commit()
+    if refreshed:
+        await invalidate_analytics_cache()
+    return refreshed
+
+
+async def run_summary_refresher(interval: int = ANALYTICS_REFRESH_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await refresh_summaries()
+        except Exception:
+            logger.exception("Refreshing analytics summaries failed")
@@ -2,6 +2,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from src.models.models import Application, Status
+from src.db.crud.base import insert_returning, update_returning
+from src.db.crud.pagination import paginate
+from src.db.crud.filters import Filters
+from src.db.crud.analytics import notify_analytics_changed, invalidate_analytics_cache
 from datetime import datetime
 
 
@@ -14,59 +18,71 @@ async def get_application(session: AsyncSession, application_id: int):
     return result.scalars().first()
 
 
-async def get_applications(session: AsyncSession, skip: int = 0, limit: int = 100):
+async def get_applications(
+    session: AsyncSession, skip: int = 0, limit: int = 100, after: str = None, filters: Filters = None
+):
+    filters = filters or Filters()
     result = await session.execute(
-        select(Application)
-        .offset(skip)
-        .limit(limit)
+        paginate(filters.apply(select(Application)), Application, limit, skip, after, filters.sort_column)
         .options(selectinload(Application.status), selectinload(Application.patent))
     )
     return result.scalars().all()
 
 
-async def get_applications_by_status(session: AsyncSession, status_id: int, skip: int = 0, limit: int = 100):
+async def get_applications_by_status(
+    session: AsyncSession, status_id: int, skip: int = 0, limit: int = 100, after: str = None
+):
     result = await session.execute(
-        select(Application)
-        .where(Application.status_id == status_id)
-        .offset(skip)
-        .limit(limit)
+        paginate(select(Application).where(Application.status_id == status_id), Application, limit, skip, after)
         .options(selectinload(Application.status), selectinload(Application.patent))
     )
     return result.scalars().all()
 
 
+APPLICATION_COLUMNS = [column.key for column in Application.__table__.columns]
+
+
+async def stream_applications(session: AsyncSession, fetch_size: int, filters: Filters = None):
+    """Yield application rows in batches of fetch_size through a server-side cursor"""
+    filters = filters or Filters()
+    query = filters.apply(select(Application.__table__)).order_by(Application.id)
+    result = await session.stream(query.execution_options(yield_per=fetch_size))
+    async for rows in result.mappings().partitions():
+        yield rows
+
+
 async def create_application(session: AsyncSession, application_data: dict):
-    db_application = Application(
-        submission_date=datetime.utcnow(),
-        documents=application_data.get("documents"),
-        status_id=application_data.get("status_id", 1),  # Default to 'Created' status (id=1)
-        employee_id=application_data.get("employee_id"),
-        author_id=application_data.get("author_id")
-    )
-    session.add(db_application)
-    await session.commit()
-    await session.refresh(db_application)
+    await notify_analytics_changed(session)
+    db_application = await insert_returning(session, Application, {
+        "submission_date": datetime.utcnow(),
+        "documents": application_data.get("documents"),
+        "status_id": application_data.get("status_id", 1),  # Default to 'Created' status (id=1)
+        "employee_id": application_data.get("employee_id"),
+        "author_id": application_data.get("author_id")
+    }, selectinload(Application.status), selectinload(Application.patent))
+    await invalidate_analytics_cache()
     return db_application
 
 
 async def update_application(session: AsyncSession, application_id: int, update_data: dict):
-    db_application = await get_application(session, application_id)
-    if not db_application:
-        return None
-    
-    for key, value in update_data.items():
-        if value is not None:
-            setattr(db_application, key, value)
-    
-    db_application.modification_date = datetime.utcnow()
-    await session.commit()
-    await session.refresh(db_application)
+    await notify_analytics_changed(session)
+    db_application = await update_returning(
+        session, Application, application_id,
+        {**update_data, "modification_date": datetime.utcnow()},
+        selectinload(Application.status), selectinload(Application.patent)
+    )
+    await invalidate_analytics_cache()
     return db_application
 
 
 async def delete_application(session: AsyncSession, application_id: int):
     db_application = await get_application(session, application_id)
     if db_application:
+        # Partitioned tables (migration 0005) have no foreign key to cascade the delete to the patent
+        if db_application.patent is not None:
+            await session.delete(db_application.patent)
         await session.delete(db_application)
+        await notify_analytics_changed(session)
         await session.commit()
+        await invalidate_analytics_cache()
     return db_application
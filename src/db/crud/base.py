@@ -0,0 +1,44 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, update, inspect
+
+
+def _returned_columns(model):
+    """Columns loaded by default, deferred ones (like search vectors) are not sent back"""
+    return [prop.columns[0] for prop in inspect(model).column_attrs if not prop.deferred]
+
+
+async def insert_returning(session: AsyncSession, model, values: dict, *options):
+    """
+    Insert one row with INSERT ... RETURNING and commit
+    Relationships passed as loader options (selectinload) are fetched by one batched
+    follow-up select before the commit, so no refresh round trip is needed
+    """
+    result = await session.execute(
+        select(model)
+        .from_statement(insert(model).values(**values).returning(*_returned_columns(model)))
+        .options(*options)
+    )
+    db_obj = result.scalars().one()
+    await session.commit()
+    return db_obj
+
+
+async def update_returning(session: AsyncSession, model, obj_id: int, values: dict, *options):
+    """
+    Update one row with UPDATE ... WHERE id = :id RETURNING and commit
+    None values are skipped. Returns None when the row does not exist
+    """
+    values = {key: value for key, value in values.items() if value is not None}
+    if not values:
+        result = await session.execute(select(model).where(model.id == obj_id).options(*options))
+        return result.scalars().first()
+
+    result = await session.execute(
+        select(model)
+        .from_statement(update(model).where(model.id == obj_id).values(**values).returning(*_returned_columns(model)))
+        .options(*options)
+        .execution_options(populate_existing=True)
+    )
+    db_obj = result.scalars().first()
+    await session.commit()
+    return db_obj
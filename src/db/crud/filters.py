@@ -0,0 +1,147 @@
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Mapping, Optional
+from sqlalchemy import exists, select, DateTime
+from src.models.models import Patent, Application, PatentAuthor
+
+# Query parameters handled by pagination and export, never treated as filters
+RESERVED_PARAMS = {"skip", "limit", "after", "format", "fetch_size"}
+
+
+class InvalidFilter(ValueError):
+    """Filter or sort key is unknown, has no supporting index, or its value does not parse"""
+
+
+def _leading_indexed(column) -> bool:
+    if column.primary_key:
+        return True
+    return any(
+        index.expressions and getattr(index.expressions[0], "key", None) == column.key
+        for index in column.table.indexes
+    )
+
+
+def _require_index(column):
+    column = column.property.columns[0] if hasattr(column, "property") else column
+    if not _leading_indexed(column):
+        raise ValueError(f"{column.table.name}.{column.key} has no index to filter or sort on")
+    return column
+
+
+@dataclass(frozen=True)
+class Filter:
+    parse: Callable[[str], Any]
+    clause: Callable[[Any], Any]
+
+
+def equals(column) -> Filter:
+    _require_index(column)
+    return Filter(int, lambda value: column == value)
+
+
+def since(column) -> Filter:
+    """column >= value"""
+    _require_index(column)
+    parse = datetime.fromisoformat if isinstance(column.type, DateTime) else date.fromisoformat
+    return Filter(parse, lambda value: column >= value)
+
+
+def _day_end(value: str) -> datetime:
+    """Exclusive upper bound, a date without time covers the whole day"""
+    if "T" in value or " " in value:
+        return datetime.fromisoformat(value) + timedelta(microseconds=1)
+    return datetime.fromisoformat(value) + timedelta(days=1)
+
+
+def until(column) -> Filter:
+    """column <= value"""
+    _require_index(column)
+    if isinstance(column.type, DateTime):
+        return Filter(_day_end, lambda value: column < value)
+    return Filter(date.fromisoformat, lambda value: column <= value)
+
+
+def patent_has_author() -> Filter:
+    _require_index(PatentAuthor.author_id)
+    return Filter(int, lambda value: exists(
+        select(PatentAuthor.patent_id)
+        .where(PatentAuthor.patent_id == Patent.id, PatentAuthor.author_id == value)
+    ))
+
+
+@dataclass
+class FilterSet:
+    """
+    Query parameters a listing accepts, and the columns it may be sorted by
+    Only indexed columns can be declared, so every accepted filter or sort is served
+    by an index and a client can not ask for a full scan
+    """
+    filters: dict[str, Filter]
+    sorts: dict[str, Any]
+
+    def __post_init__(self):
+        for column in self.sorts.values():
+            _require_index(column)
+
+    def parse(self, params: Mapping[str, str]) -> "Filters":
+        clauses = []
+        sort = None
+        for key, value in params.items():
+            if key in RESERVED_PARAMS:
+                continue
+            if key == "sort":
+                if value not in self.sorts:
+                    raise InvalidFilter(f"Sorting by {value} is not supported, use one of: {', '.join(self.sorts)}")
+                sort = None if value == "id" else value
+                continue
+            if key not in self.filters:
+                raise InvalidFilter(f"Unknown filter {key}, use one of: {', '.join(self.filters)}")
+            try:
+                parsed = self.filters[key].parse(value)
+            except (TypeError, ValueError):
+                raise InvalidFilter(f"Invalid value for {key}: {value}")
+            clauses.append(self.filters[key].clause(parsed))
+        return Filters(clauses, sort, self.sorts[sort] if sort else None)
+
+
+@dataclass
+class Filters:
+    clauses: list = field(default_factory=list)
+    sort: Optional[str] = None
+    sort_column: Any = None
+
+    def apply(self, query):
+        return query.where(*self.clauses)
+
+
+PATENT_FILTERS = FilterSet(
+    filters={
+        "status_id": equals(Patent.status_id),
+        "patent_type_id": equals(Patent.patent_type_id),
+        "rights_holder_id": equals(Patent.rights_holder_id),
+        "author_id": patent_has_author(),
+        "issue_date_from": since(Patent.issue_date),
+        "issue_date_to": until(Patent.issue_date),
+        "expiration_date_from": since(Patent.expiration_date),
+        "expiration_date_to": until(Patent.expiration_date),
+    },
+    sorts={
+        "id": Patent.id,
+        "issue_date": Patent.issue_date,
+        "expiration_date": Patent.expiration_date,
+    },
+)
+
+APPLICATION_FILTERS = FilterSet(
+    filters={
+        "status_id": equals(Application.status_id),
+        "employee_id": equals(Application.employee_id),
+        "author_id": equals(Application.author_id),
+        "submission_date_from": since(Application.submission_date),
+        "submission_date_to": until(Application.submission_date),
+    },
+    sorts={
+        "id": Application.id,
+        "submission_date": Application.submission_date,
+    },
+)
@@ -0,0 +1,108 @@
+from datetime import date, datetime
+from typing import Optional
+import base64
+import json
+from sqlalchemy import Date, DateTime, select, tuple_, union_all
+
+
+class InvalidCursor(ValueError):
+    """Cursor is malformed or was issued for another sort order"""
+
+
+def encode_cursor(sort: str, values: list) -> str:
+    raw = json.dumps({"s": sort, "k": values}, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, size: int) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        values = data["k"]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if data.get("s") != sort or not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("Cursor does not match sort order")
+    return values
+
+
+def _coerce(column, value):
+    if value is None:
+        return None
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Date):
+        return date.fromisoformat(value)
+    return value
+
+
+def paginate(query, model, limit: int, skip: int = 0, after: Optional[str] = None, sort_column=None):
+    """
+    Order query by sort column and primary key and continue after cursor
+    Keyset pagination uses an index seek instead of scanning skipped rows; skip is
+    kept for old clients and ignored when a cursor is given
+    """
+    columns = [model.id] if sort_column is None else [sort_column, model.id]
+    values = _cursor_values(after, columns) if after else None
+    if sort_column is not None and sort_column.nullable:
+        return _paginate_nullable(query, model, limit, skip, values, sort_column)
+
+    query = query.order_by(*columns)
+    if values:
+        if len(columns) == 1:
+            query = query.where(columns[0] > values[0])
+        else:
+            query = query.where(tuple_(*columns) > tuple_(*values))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def _cursor_values(after: str, columns) -> list:
+    values = decode_cursor(after, _sort_name(columns), len(columns))
+    try:
+        return [_coerce(column, value) for column, value in zip(columns, values)]
+    except (TypeError, ValueError):
+        raise InvalidCursor("Malformed cursor")
+
+
+def _paginate_nullable(query, model, limit: int, skip: int, values: Optional[list], sort_column):
+    """
+    Rows with a value come first in (sort column, id) order, rows without one follow by id
+    A row comparison can not step past NULLs, so each part is an index seek of its own
+    limited to one page, and only those rows are merged and sorted
+    """
+    parts = []
+    keys = query.with_only_columns(model.id, sort_column)
+    if values is None or values[0] is not None:
+        present = keys.where(sort_column.isnot(None))
+        if values:
+            present = present.where(tuple_(sort_column, model.id) > tuple_(*values))
+        parts.append(present.order_by(sort_column, model.id).limit(limit + skip))
+    missing = keys.where(sort_column.is_(None))
+    if values and values[0] is None:
+        missing = missing.where(model.id > values[1])
+    parts.append(missing.order_by(model.id).limit(limit + skip))
+
+    page = union_all(*(select(part.subquery()) for part in parts)).subquery()
+    query = (
+        select(model)
+        .join(page, page.c.id == model.id)
+        .order_by(page.c[sort_column.key].nulls_last(), page.c.id)
+    )
+    if skip and not values:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def next_cursor(items, limit: int, sort: Optional[str] = None) -> Optional[str]:
+    """Cursor for the page after items, None when this was the last page"""
+    if not items or len(items) < limit:
+        return None
+    keys = ["id"] if sort is None else [sort, "id"]
+    last = items[-1]
+    return encode_cursor(",".join(keys), [getattr(last, key) for key in keys])
+
+
+def _sort_name(columns) -> str:
+    return ",".join(column.key for column in columns)
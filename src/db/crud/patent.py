@@ -1,9 +1,18 @@
+import os
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, insert, and_, or_, func
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import selectinload
 from src.models.models import Patent
+from src.db.crud.base import insert_returning, update_returning
+from src.db.crud.pagination import paginate, decode_cursor, InvalidCursor
+from src.db.crud.filters import Filters
+from src.db.crud.analytics import notify_analytics_changed, invalidate_analytics_cache
 from datetime import datetime, date, timedelta
 
+PATENT_BULK_BATCH_SIZE = int(os.getenv("PATENT_BULK_BATCH_SIZE", 500))
+PATENT_BULK_MAX_BATCH_SIZE = int(os.getenv("PATENT_BULK_MAX_BATCH_SIZE", 5000))
+
 
 async def get_patent(session: AsyncSession, patent_id: int):
     result = await session.execute(
@@ -14,66 +23,164 @@ async def get_patent(session: AsyncSession, patent_id: int):
     return result.scalars().first()
 
 
-async def get_patents(session: AsyncSession, skip: int = 0, limit: int = 100):
+async def get_patents(
+    session: AsyncSession, skip: int = 0, limit: int = 100, after: str = None, filters: Filters = None
+):
+    filters = filters or Filters()
     result = await session.execute(
-        select(Patent)
-        .offset(skip)
-        .limit(limit)
+        paginate(filters.apply(select(Patent)), Patent, limit, skip, after, filters.sort_column)
         .options(selectinload(Patent.status))
     )
     return result.scalars().all()
 
 
+SEARCH_HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10"
+
+
+def _search_query(q: str):
+    return func.websearch_to_tsquery("russian", q).op("||")(func.websearch_to_tsquery("english", q))
+
+
+async def search_patents(session: AsyncSession, q: str, skip: int = 0, limit: int = 100, after: str = None):
+    """
+    Full-text search over title and description, best matches first
+    Returns (patent, rank, snippet) rows. Snippets are built only for the returned page
+    """
+    query = _search_query(q)
+    rank = func.ts_rank(Patent.search_vector, query)
+    matches = select(Patent.id, rank.label("rank")).where(Patent.search_vector.op("@@")(query))
+    if after:
+        last_rank, last_id = decode_cursor(after, "rank,id", 2)
+        if not isinstance(last_rank, (int, float)) or not isinstance(last_id, int):
+            raise InvalidCursor("Malformed cursor")
+        matches = matches.where(or_(rank < last_rank, and_(rank == last_rank, Patent.id > last_id)))
+    elif skip:
+        matches = matches.offset(skip)
+    matches = matches.order_by(rank.desc(), Patent.id).limit(limit).subquery()
+
+    snippet = func.ts_headline(
+        "russian", func.concat_ws(" ", Patent.title, Patent.description), query, SEARCH_HEADLINE_OPTIONS
+    )
+    result = await session.execute(
+        select(Patent, matches.c.rank, snippet.label("snippet"))
+        .join(matches, matches.c.id == Patent.id)
+        .order_by(matches.c.rank.desc(), Patent.id)
+        .options(selectinload(Patent.status))
+    )
+    return result.all()
+
+
+PATENT_COLUMNS = [column.key for column in Patent.__table__.columns if column.computed is None]
+
+
+async def stream_patents(session: AsyncSession, fetch_size: int, filters: Filters = None):
+    """Yield patent rows in batches of fetch_size through a server-side cursor"""
+    filters = filters or Filters()
+    result = await session.stream(
+        filters.apply(select(*(Patent.__table__.c[key] for key in PATENT_COLUMNS)))
+        .order_by(Patent.id)
+        .execution_options(yield_per=fetch_size)
+    )
+    async for rows in result.mappings().partitions():
+        yield rows
+
+
+def expired_by(day: date):
+    """
+    Patents expired before day
+    Nothing keeps issue_date before expiration_date, so there is no issue_date bound and
+    every partition is scanned through its expiration_date index
+    """
+    return Patent.expiration_date < day
+
+
 async def get_expired_patents(session: AsyncSession):
     today = date.today()
     result = await session.execute(
         select(Patent)
-        .where(Patent.expiration_date < today)
+        .where(expired_by(today))
         .options(selectinload(Patent.status))
     )
     return result.scalars().all()
 
 
-async def get_patents_by_owner(session: AsyncSession, owner_id: int):
+async def get_patents_by_owner(
+    session: AsyncSession, owner_id: int, skip: int = 0, limit: int = 100, after: str = None,
+    filters: Filters = None
+):
+    filters = filters or Filters()
+    query = filters.apply(select(Patent).where(Patent.rights_holder_id == owner_id))
     result = await session.execute(
-        select(Patent)
-        .where(Patent.rights_holder_id == owner_id)
+        paginate(query, Patent, limit, skip, after, filters.sort_column)
         .options(selectinload(Patent.status))
     )
     return result.scalars().all()
 
 
-async def create_patent(session: AsyncSession, patent_data: dict):
+def _patent_values(patent_data: dict) -> dict:
     today = date.today()
     expiration_date = today + timedelta(days=365)
     
-    db_patent = Patent(
-        title=patent_data.get("title"),
-        issue_date=patent_data.get("issue_date", today),
-        expiration_date=expiration_date,  
-        description=patent_data.get("description"),
-        rights_holder_id=patent_data.get("rights_holder_id"),
-        patent_type_id=patent_data.get("patent_type_id"),
-        status_id=patent_data.get("status_id", 1),  
-        application_id=patent_data.get("application_id")
-    )
-    session.add(db_patent)
-    await session.commit()
-    await session.refresh(db_patent, ["status"])
+    return {
+        "title": patent_data.get("title"),
+        "issue_date": patent_data.get("issue_date", today),
+        "expiration_date": expiration_date,
+        "description": patent_data.get("description"),
+        "rights_holder_id": patent_data.get("rights_holder_id"),
+        "patent_type_id": patent_data.get("patent_type_id"),
+        "status_id": patent_data.get("status_id", 1),
+        "application_id": patent_data.get("application_id")
+    }
+
+
+async def create_patent(session: AsyncSession, patent_data: dict):
+    await notify_analytics_changed(session)
+    db_patent = await insert_returning(session, Patent, _patent_values(patent_data), selectinload(Patent.status))
+    await invalidate_analytics_cache()
     return db_patent
 
 
-async def update_patent(session: AsyncSession, patent_id: int, update_data: dict):
-    db_patent = await get_patent(session, patent_id)
-    if not db_patent:
-        return None
-    
-    for key, value in update_data.items():
-        if value is not None:
-            setattr(db_patent, key, value)
-    
+async def bulk_create_patents(session: AsyncSession, records: list[dict]) -> list[dict]:
+    """
+    Insert a batch of patents with one multi-row INSERT ... RETURNING and commit
+    If the batch is refused (a constraint, a value out of range), rows are retried one by
+    one in savepoints to find the failing ones. Returns {"id"} or {"error"} per record, in input order
+    """
+    values = [_patent_values(record) for record in records]
+    try:
+        ids = await session.scalars(
+            insert(Patent).returning(Patent.id, sort_by_parameter_order=True), values
+        )
+        results = [{"id": patent_id} for patent_id in ids]
+        await notify_analytics_changed(session)
+        await session.commit()
+        await invalidate_analytics_cache()
+        return results
+    except DBAPIError as exc:
+        if exc.connection_invalidated:
+            raise
+        await session.rollback()
+
+    results = []
+    for row in values:
+        try:
+            async with session.begin_nested():
+                result = await session.execute(insert(Patent).values(**row).returning(Patent.id))
+                results.append({"id": result.scalar_one()})
+        except DBAPIError as exc:
+            if exc.connection_invalidated:
+                raise
+            results.append({"error": str(exc.orig).splitlines()[-1]})
+    await notify_analytics_changed(session)
     await session.commit()
-    await session.refresh(db_patent)
+    await invalidate_analytics_cache()
+    return results
+
+
+async def update_patent(session: AsyncSession, patent_id: int, update_data: dict):
+    await notify_analytics_changed(session)
+    db_patent = await update_returning(session, Patent, patent_id, update_data, selectinload(Patent.status))
+    await invalidate_analytics_cache()
     return db_patent
 
 
@@ -81,5 +188,7 @@ async def delete_patent(session: AsyncSession, patent_id: int):
     db_patent = await get_patent(session, patent_id)
     if db_patent:
         await session.delete(db_patent)
+        await notify_analytics_changed(session)
         await session.commit()
+        await invalidate_analytics_cache()
     return db_patent
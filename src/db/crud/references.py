@@ -1,6 +1,42 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, or_
 from src.models.models import Employee, Author, RightsHolder, Status, PatentType, Position
+from src.db.crud.base import insert_returning, update_returning
+from src.db.crud.pagination import paginate
+
+
+def _like_pattern(q: str) -> str:
+    return "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+async def _suggest(session: AsyncSession, model, column, q: str, limit: int):
+    """
+    id/name pairs whose name is similar to q or contains it, most similar first
+    Both predicates are served by the pg_trgm GIN index on the column
+    """
+    score = func.similarity(column, q)
+    result = await session.execute(
+        select(model.id, column.label("name"))
+        .where(or_(column.op("%")(q), column.ilike(_like_pattern(q), escape="\\")))
+        .order_by(score.desc(), column, model.id)
+        .limit(limit)
+    )
+    return result.mappings().all()
+
+
+async def suggest_employees(session: AsyncSession, q: str, limit: int = 10):
+    """Suggest employees by full name"""
+    return await _suggest(session, Employee, Employee.full_name, q, limit)
+
+
+async def suggest_authors(session: AsyncSession, q: str, limit: int = 10):
+    """Suggest authors by full name"""
+    return await _suggest(session, Author, Author.full_name, q, limit)
+
+
+async def suggest_rights_holders(session: AsyncSession, q: str, limit: int = 10):
+    """Suggest rights holders by name"""
+    return await _suggest(session, RightsHolder, RightsHolder.name, q, limit)
 
 
 async def get_employee(session: AsyncSession, employee_id: int):
@@ -9,41 +45,27 @@ async def get_employee(session: AsyncSession, employee_id: int):
     return result.scalars().first()
 
 
-async def get_employees(session: AsyncSession, skip: int = 0, limit: int = 100):
+async def get_employees(session: AsyncSession, skip: int = 0, limit: int = 100, after: str = None):
     """Get list of employees"""
-    result = await session.execute(select(Employee).offset(skip).limit(limit))
+    result = await session.execute(paginate(select(Employee), Employee, limit, skip, after))
     return result.scalars().all()
 
 
 async def create_employee(session: AsyncSession, employee_data: dict):
     """Create new employee"""
-    db_employee = Employee(
-        full_name=employee_data.get("full_name"),
-        employment_date=employee_data.get("employment_date"),
-        termination_date=employee_data.get("termination_date"),
-        phone_number=employee_data.get("phone_number"),
-        position_id=employee_data.get("position_id"),
-        passport_id=employee_data.get("passport_id")
-    )
-    session.add(db_employee)
-    await session.commit()
-    await session.refresh(db_employee)
-    return db_employee
+    return await insert_returning(session, Employee, {
+        "full_name": employee_data.get("full_name"),
+        "employment_date": employee_data.get("employment_date"),
+        "termination_date": employee_data.get("termination_date"),
+        "phone_number": employee_data.get("phone_number"),
+        "position_id": employee_data.get("position_id"),
+        "passport_id": employee_data.get("passport_id")
+    })
 
 
 async def update_employee(session: AsyncSession, employee_id: int, update_data: dict):
     """Update employee"""
-    db_employee = await get_employee(session, employee_id)
-    if not db_employee:
-        return None
-    
-    for key, value in update_data.items():
-        if value is not None:
-            setattr(db_employee, key, value)
-    
-    await session.commit()
-    await session.refresh(db_employee)
-    return db_employee
+    return await update_returning(session, Employee, employee_id, update_data)
 
 
 async def delete_employee(session: AsyncSession, employee_id: int):
@@ -61,37 +83,23 @@ async def get_author(session: AsyncSession, author_id: int):
     return result.scalars().first()
 
 
-async def get_authors(session: AsyncSession, skip: int = 0, limit: int = 100):
+async def get_authors(session: AsyncSession, skip: int = 0, limit: int = 100, after: str = None):
     """Get list of authors"""
-    result = await session.execute(select(Author).offset(skip).limit(limit))
+    result = await session.execute(paginate(select(Author), Author, limit, skip, after))
     return result.scalars().all()
 
 
 async def create_author(session: AsyncSession, author_data: dict):
     """Create new author"""
-    db_author = Author(
-        full_name=author_data.get("full_name"),
-        passport_id=author_data.get("passport_id")
-    )
-    session.add(db_author)
-    await session.commit()
-    await session.refresh(db_author)
-    return db_author
+    return await insert_returning(session, Author, {
+        "full_name": author_data.get("full_name"),
+        "passport_id": author_data.get("passport_id")
+    })
 
 
 async def update_author(session: AsyncSession, author_id: int, update_data: dict):
     """Update author"""
-    db_author = await get_author(session, author_id)
-    if not db_author:
-        return None
-    
-    for key, value in update_data.items():
-        if value is not None:
-            setattr(db_author, key, value)
-    
-    await session.commit()
-    await session.refresh(db_author)
-    return db_author
+    return await update_returning(session, Author, author_id, update_data)
 
 
 async def delete_author(session: AsyncSession, author_id: int):
@@ -109,36 +117,22 @@ async def get_rights_holder(session: AsyncSession, holder_id: int):
     return result.scalars().first()
 
 
-async def get_rights_holders(session: AsyncSession, skip: int = 0, limit: int = 100):
+async def get_rights_holders(session: AsyncSession, skip: int = 0, limit: int = 100, after: str = None):
     """Get list of rights holders"""
-    result = await session.execute(select(RightsHolder).offset(skip).limit(limit))
+    result = await session.execute(paginate(select(RightsHolder), RightsHolder, limit, skip, after))
     return result.scalars().all()
 
 
 async def create_rights_holder(session: AsyncSession, holder_data: dict):
     """Create new rights holder"""
-    db_holder = RightsHolder(
-        name=holder_data.get("name")
-    )
-    session.add(db_holder)
-    await session.commit()
-    await session.refresh(db_holder)
-    return db_holder
+    return await insert_returning(session, RightsHolder, {
+        "name": holder_data.get("name")
+    })
 
 
 async def update_rights_holder(session: AsyncSession, holder_id: int, update_data: dict):
     """Update rights holder"""
-    db_holder = await get_rights_holder(session, holder_id)
-    if not db_holder:
-        return None
-    
-    for key, value in update_data.items():
-        if value is not None:
-            setattr(db_holder, key, value)
-    
-    await session.commit()
-    await session.refresh(db_holder)
-    return db_holder
+    return await update_returning(session, RightsHolder, holder_id, update_data)
 
 
 async def delete_rights_holder(session: AsyncSession, holder_id: int):
@@ -164,28 +158,14 @@ async def get_statuses(session: AsyncSession, skip: int = 0, limit: int = 100):
 
 async def create_status(session: AsyncSession, status_data: dict):
     """Create new status"""
-    db_status = Status(
-        name=status_data.get("name")
-    )
-    session.add(db_status)
-    await session.commit()
-    await session.refresh(db_status)
-    return db_status
+    return await insert_returning(session, Status, {
+        "name": status_data.get("name")
+    })
 
 
 async def update_status(session: AsyncSession, status_id: int, update_data: dict):
     """Update status"""
-    db_status = await get_status(session, status_id)
-    if not db_status:
-        return None
-    
-    for key, value in update_data.items():
-        if value is not None:
-            setattr(db_status, key, value)
-    
-    await session.commit()
-    await session.refresh(db_status)
-    return db_status
+    return await update_returning(session, Status, status_id, update_data)
 
 
 async def delete_status(session: AsyncSession, status_id: int):
@@ -211,28 +191,14 @@ async def get_patent_types(session: AsyncSession, skip: int = 0, limit: int = 10
 
 async def create_patent_type(session: AsyncSession, type_data: dict):
     """Create new patent type"""
-    db_type = PatentType(
-        name=type_data.get("name")
-    )
-    session.add(db_type)
-    await session.commit()
-    await session.refresh(db_type)
-    return db_type
+    return await insert_returning(session, PatentType, {
+        "name": type_data.get("name")
+    })
 
 
 async def update_patent_type(session: AsyncSession, type_id: int, update_data: dict):
     """Update patent type"""
-    db_type = await get_patent_type(session, type_id)
-    if not db_type:
-        return None
-    
-    for key, value in update_data.items():
-        if value is not None:
-            setattr(db_type, key, value)
-    
-    await session.commit()
-    await session.refresh(db_type)
-    return db_type
+    return await update_returning(session, PatentType, type_id, update_data)
 
 
 async def delete_patent_type(session: AsyncSession, type_id: int):
@@ -258,50 +224,7 @@ async def get_positions(session: AsyncSession, skip: int = 0, limit: int = 100):
 
 async def create_position(session: AsyncSession, position_data: dict):
     """Create new position"""
-    db_position = Position(
-        name=position_data.get("name")
-    )
-    session.add(db_position)
-    await session.commit()
-    await session.refresh(db_position)
-    return db_position
-
-
-async def create_employee_internal(
-    session: AsyncSession,
-    full_name: str,
-    position_id: int,
-    employment_date=None,
-    phone_number=None
-):
-    """
-    Create employee record during registration
-    Used internally by auth.register endpoint
-    """
-    db_employee = Employee(
-        full_name=full_name,
-        employment_date=employment_date,
-        phone_number=phone_number,
-        position_id=position_id
-    )
-    session.add(db_employee)
-    await session.commit()
-    await session.refresh(db_employee)
-    return db_employee
+    return await insert_returning(session, Position, {
+        "name": position_data.get("name")
+    })
 
-
-async def create_author_internal(
-    session: AsyncSession,
-    full_name: str
-):
-    """
-    Create author record during registration
-    Used internally by auth.register endpoint
-    """
-    db_author = Author(
-        full_name=full_name
-    )
-    session.add(db_author)
-    await session.commit()
-    await session.refresh(db_author)
-    return db_author
@@ -0,0 +1,58 @@
+from datetime import datetime
+import asyncio
+import logging
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
+from src.models.models import RevokedToken
+from src.core.revocation import revoked_tokens, REVOCATION_PRUNE_INTERVAL
+from src.db.database import SessionLocal
+from src.db.notify import listener, notify
+
+logger = logging.getLogger(__name__)
+
+TOKEN_REVOKED_CHANNEL = "token_revoked"
+
+listener.subscribe(TOKEN_REVOKED_CHANNEL, revoked_tokens.add)
+
+
+async def revoke_token(session: AsyncSession, jti: str, expires_at: datetime) -> bool:
+    """Revoke token id, False if it was already revoked"""
+    result = await session.execute(
+        insert(RevokedToken)
+        .values(jti=jti, expires_at=expires_at)
+        .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+        .returning(RevokedToken.jti)
+    )
+    revoked = result.scalar() is not None
+    if revoked:
+        await notify(session, TOKEN_REVOKED_CHANNEL, jti)
+    await session.commit()
+    revoked_tokens.add(jti)
+    return revoked
+
+
+async def load_revoked_tokens(session: AsyncSession):
+    """Rebuild in-memory revocation index from unexpired rows"""
+    revoked_tokens.start_rebuild()
+    result = await session.execute(
+        select(RevokedToken.jti).where(RevokedToken.expires_at > datetime.utcnow())
+    )
+    revoked_tokens.rebuild(result.scalars())
+
+
+async def prune_revoked_tokens(session: AsyncSession):
+    """Delete revocations of tokens that expired anyway and rebuild the index"""
+    await session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+    await session.commit()
+    await load_revoked_tokens(session)
+
+
+async def run_revocation_pruner(interval: int = REVOCATION_PRUNE_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with SessionLocal() as session:
+                await prune_revoked_tokens(session)
+        except Exception:
+            logger.exception("Pruning revoked tokens failed")
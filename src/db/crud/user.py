@@ -1,7 +1,49 @@
+import os
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from src.models.models import User
-from src.core.security import hash_password
+from sqlalchemy import select, insert, func, literal, null, or_, Date, String
+from sqlalchemy.exc import IntegrityError
+from src.models.models import User, Employee, Author, Position
+from src.core.cache import TTLCache
+from src.db.crud.base import insert_returning, update_returning
+from src.core.security import hash_password_async, hash_passwords_async
+from src.db.notify import listener, notify
+
+USER_STATUS_CACHE_TTL = float(os.getenv("USER_STATUS_CACHE_TTL", 30))
+USER_STATUS_CACHE_SIZE = int(os.getenv("USER_STATUS_CACHE_SIZE", 10000))
+USER_STATUS_CHANNEL = "user_status"
+USER_BULK_BATCH_SIZE = int(os.getenv("USER_BULK_BATCH_SIZE", 200))
+
+_user_status_cache = TTLCache(ttl=USER_STATUS_CACHE_TTL, max_size=USER_STATUS_CACHE_SIZE)
+
+
+def invalidate_user_status(user_id: int):
+    """Drop cached active flag for user in this worker"""
+    _user_status_cache.invalidate(user_id)
+
+
+def get_user_status_cache_metrics():
+    return _user_status_cache.stats()
+
+
+listener.subscribe(USER_STATUS_CHANNEL, lambda payload: invalidate_user_status(int(payload)))
+
+
+async def _update_user_row(session: AsyncSession, user_id: int, values: dict):
+    await notify(session, USER_STATUS_CHANNEL, str(user_id))
+    db_user = await update_returning(session, User, user_id, values)
+    invalidate_user_status(user_id)
+    return db_user
+
+
+async def is_user_active(session: AsyncSession, user_id: int) -> bool:
+    """Check that user exists and is active, cached for USER_STATUS_CACHE_TTL seconds"""
+    active = _user_status_cache.get(user_id)
+    if active is None:
+        result = await session.execute(select(User.is_active).where(User.id == user_id))
+        active = bool(result.scalar())
+        _user_status_cache.set(user_id, active)
+    return active
 
 
 async def get_user_by_id(session: AsyncSession, user_id: int):
@@ -22,6 +64,39 @@ async def get_user_by_email(session: AsyncSession, email: str):
     return result.scalars().first()
 
 
+async def get_auth_profile(
+    session: AsyncSession,
+    username: Optional[str] = None,
+    user_id: Optional[int] = None
+):
+    """
+    Get user with employee position name in one joined query
+    Returns a lightweight row instead of ORM objects, so nothing is lazy loaded later
+    """
+    query = (
+        select(
+            User.id,
+            User.email,
+            User.username,
+            User.hashed_password,
+            User.is_active,
+            User.created_at,
+            User.user_type,
+            User.employee_id,
+            User.author_id,
+            Position.name.label("position_name")
+        )
+        .outerjoin(Employee, Employee.id == User.employee_id)
+        .outerjoin(Position, Position.id == Employee.position_id)
+    )
+    if user_id is not None:
+        query = query.where(User.id == user_id)
+    else:
+        query = query.where(User.username == username)
+    result = await session.execute(query)
+    return result.first()
+
+
 async def create_user(
     session: AsyncSession,
     email: str,
@@ -32,59 +107,225 @@ async def create_user(
     author_id: int = None
 ):
     """Create new user"""
-    hashed_password = hash_password(password)
-    db_user = User(
-        email=email,
-        username=username,
-        hashed_password=hashed_password,
-        user_type=user_type,
-        employee_id=employee_id,
-        author_id=author_id,
-        is_active=True
+    hashed_password = await hash_password_async(password)
+    return await insert_returning(session, User, {
+        "email": email,
+        "username": username,
+        "hashed_password": hashed_password,
+        "user_type": user_type,
+        "employee_id": employee_id,
+        "author_id": author_id,
+        "is_active": True
+    })
+
+
+class RegistrationConflict(Exception):
+    """Username or email is already taken"""
+
+    def __init__(self, field: str):
+        super().__init__(f"{field} already registered")
+        self.field = field
+
+
+def _violated_constraint(exc: IntegrityError) -> str:
+    cause = getattr(exc.orig, "__cause__", None)
+    return getattr(cause, "constraint_name", None) or str(exc.orig)
+
+
+async def register_user(
+    session: AsyncSession,
+    email: str,
+    username: str,
+    hashed_password: str,
+    user_type: str,
+    full_name: str,
+    position_id: int = None,
+    employment_date=None,
+    phone_number: str = None
+):
+    """
+    Create Employee or Author together with its User in a single statement
+    Both inserts run as data-modifying CTEs, so either both rows exist or none does.
+    Returns None when the position does not exist
+    """
+    if user_type == "employee":
+        person = (
+            insert(Employee)
+            .from_select(
+                ["full_name", "employment_date", "phone_number", "position_id"],
+                select(
+                    literal(full_name, String()),
+                    literal(employment_date, Date()),
+                    literal(phone_number, String()),
+                    Position.id
+                ).where(Position.id == position_id)
+            )
+            .returning(Employee.id, Employee.position_id)
+            .cte("person")
+        )
+        employee_id, author_id = person.c.id, null()
+    else:
+        person = (
+            insert(Author)
+            .values(full_name=full_name)
+            .returning(Author.id)
+            .cte("person")
+        )
+        employee_id, author_id = null(), person.c.id
+
+    new_user = (
+        insert(User)
+        .from_select(
+            ["email", "username", "hashed_password", "user_type", "is_active", "employee_id", "author_id", "created_at"],
+            select(
+                literal(email, String()),
+                literal(username, String()),
+                literal(hashed_password, String()),
+                literal(user_type, String()),
+                literal(True),
+                employee_id,
+                author_id,
+                # The Python-side default is not applied to INSERT ... SELECT, same UTC time as datetime.utcnow
+                func.timezone("UTC", func.now())
+            ).select_from(person)
+        )
+        .returning(User.id, User.username, User.user_type, User.employee_id, User.author_id)
+        .cte("new_user")
     )
-    session.add(db_user)
-    await session.commit()
-    await session.refresh(db_user)
-    return db_user
+
+    if user_type == "employee":
+        query = (
+            select(new_user, Position.name.label("position_name"))
+            .select_from(new_user)
+            .join(person, person.c.id == new_user.c.employee_id)
+            .join(Position, Position.id == person.c.position_id)
+        )
+    else:
+        query = select(new_user, literal(None, String()).label("position_name"))
+
+    try:
+        result = await session.execute(query)
+        registered = result.first()
+        await session.commit()
+    except IntegrityError as exc:
+        await session.rollback()
+        constraint = _violated_constraint(exc)
+        if "username" in constraint:
+            raise RegistrationConflict("Username")
+        if "email" in constraint:
+            raise RegistrationConflict("Email")
+        raise
+    return registered
+
+
+async def bulk_register_users(session: AsyncSession, records: list[dict]) -> list[dict]:
+    """
+    Create a batch of users with their Employee/Author rows in one transaction
+    Records carry the register_user arguments with a plain "password". Taken usernames and
+    emails and unknown positions are rejected first, so only the remaining passwords are
+    hashed. Returns one {"user_id"} or {"error"} entry per record, in input order
+    """
+    results: list[dict] = [{} for _ in records]
+    usernames = [r["username"] for r in records]
+    emails = [r["email"] for r in records]
+    position_ids = {r["position_id"] for r in records if r["user_type"] == "employee"}
+
+    taken = await session.execute(
+        select(User.username, User.email)
+        .where(or_(User.username.in_(usernames), User.email.in_(emails)))
+    )
+    taken_usernames, taken_emails = set(), set()
+    for row in taken:
+        taken_usernames.add(row.username)
+        taken_emails.add(row.email)
+
+    positions = set()
+    if position_ids:
+        positions = set((await session.execute(
+            select(Position.id).where(Position.id.in_(position_ids))
+        )).scalars())
+
+    pending = []
+    for i, record in enumerate(records):
+        if record["username"] in taken_usernames:
+            results[i] = {"error": "Username already registered"}
+        elif record["email"] in taken_emails:
+            results[i] = {"error": "Email already registered"}
+        elif record["user_type"] == "employee" and record["position_id"] not in positions:
+            results[i] = {"error": "Position not found"}
+        else:
+            taken_usernames.add(record["username"])
+            taken_emails.add(record["email"])
+            pending.append(i)
+
+    hashed = await hash_passwords_async([records[i]["password"] for i in pending])
+    hashed_passwords = dict(zip(pending, hashed))
+
+    employees = [i for i in pending if records[i]["user_type"] == "employee"]
+    authors = [i for i in pending if records[i]["user_type"] == "author"]
+    person_ids: dict[int, tuple] = {}
+    try:
+        if employees:
+            ids = await session.scalars(
+                insert(Employee).returning(Employee.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "full_name": records[i]["full_name"],
+                        "employment_date": records[i].get("employment_date"),
+                        "phone_number": records[i].get("phone_number"),
+                        "position_id": records[i]["position_id"],
+                    }
+                    for i in employees
+                ]
+            )
+            person_ids.update((i, (person_id, None)) for i, person_id in zip(employees, ids))
+        if authors:
+            ids = await session.scalars(
+                insert(Author).returning(Author.id, sort_by_parameter_order=True),
+                [{"full_name": records[i]["full_name"]} for i in authors]
+            )
+            person_ids.update((i, (None, person_id)) for i, person_id in zip(authors, ids))
+        if pending:
+            user_ids = await session.scalars(
+                insert(User).returning(User.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "email": records[i]["email"],
+                        "username": records[i]["username"],
+                        "hashed_password": hashed_passwords[i],
+                        "user_type": records[i]["user_type"],
+                        "is_active": True,
+                        "employee_id": person_ids[i][0],
+                        "author_id": person_ids[i][1],
+                    }
+                    for i in pending
+                ]
+            )
+            for i, user_id in zip(pending, user_ids):
+                results[i] = {"user_id": user_id}
+        await session.commit()
+    except IntegrityError as exc:
+        await session.rollback()
+        error = f"Batch rolled back: {_violated_constraint(exc)}"
+        for i in pending:
+            results[i] = {"error": error}
+    return results
 
 
 async def update_user(session: AsyncSession, user_id: int, update_data: dict):
     """Update user"""
-    db_user = await get_user_by_id(session, user_id)
-    if not db_user:
-        return None
-    
-    for key, value in update_data.items():
-        if value is not None:
-            if key == "password":
-                setattr(db_user, "hashed_password", hash_password(value))
-            else:
-                setattr(db_user, key, value)
-    
-    await session.commit()
-    await session.refresh(db_user)
-    return db_user
+    values = dict(update_data)
+    password = values.pop("password", None)
+    if password is not None:
+        values["hashed_password"] = await hash_password_async(password)
+    return await _update_user_row(session, user_id, values)
 
 
 async def deactivate_user(session: AsyncSession, user_id: int):
     """Deactivate user"""
-    db_user = await get_user_by_id(session, user_id)
-    if not db_user:
-        return None
-    
-    db_user.is_active = False
-    await session.commit()
-    await session.refresh(db_user)
-    return db_user
+    return await _update_user_row(session, user_id, {"is_active": False})
 
 
 async def activate_user(session: AsyncSession, user_id: int):
     """Activate user"""
-    db_user = await get_user_by_id(session, user_id)
-    if not db_user:
-        return None
-    
-    db_user.is_active = True
-    await session.commit()
-    await session.refresh(db_user)
-    return db_user
+    return await _update_user_row(session, user_id, {"is_active": True})
@@ -1,21 +1,185 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from contextlib import asynccontextmanager
+from typing import Optional
+import itertools
+import os
+import time
+from dotenv import load_dotenv
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from src.core.cache import TTLCache
+from src.core.metrics import Histogram
 
-SQLALCHEMY_DATABASE_URL = "postgresql+asyncpg://postgres:1@localhost/patent"
-engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=False)
+load_dotenv()
+
+
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+asyncpg://postgres:1@localhost/patent")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+DB_STREAM_FETCH_SIZE = int(os.getenv("DB_STREAM_FETCH_SIZE", 1000))
+DB_STREAM_MAX_FETCH_SIZE = int(os.getenv("DB_STREAM_MAX_FETCH_SIZE", 10000))
+
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+DB_REPLICA_STRATEGY = os.getenv("DB_REPLICA_STRATEGY", "round_robin")  # round_robin или least_inflight
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", 5))
+READ_YOUR_WRITES_COOKIE = "last_write"
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait and how often they time out"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_wait = Histogram()
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.checkout_wait.observe(time.perf_counter() - start)
+
+
+def create_engine(url: str) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        echo=False,
+        poolclass=MeteredPool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args={"statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+    )
+
+
+def asyncpg_dsn(engine: AsyncEngine) -> str:
+    """Plain libpq DSN of engine, for code that talks to asyncpg directly"""
+    return engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def pool_metrics(engine: AsyncEngine) -> dict:
+    pool = engine.sync_engine.pool
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow_in_use": max(pool.overflow(), 0),
+        "timeouts": pool.timeouts,
+        "checkout_wait_seconds": pool.checkout_wait.snapshot(),
+    }
+
+
+class ReplicaSet:
+    """Read replica engines with round-robin or least in-flight selection"""
+
+    def __init__(self, urls: list[str], strategy: str):
+        self.strategy = strategy
+        self.engines = [create_engine(url) for url in urls]
+        self.session_makers = [async_sessionmaker(e, expire_on_commit=False) for e in self.engines]
+        self.in_flight = [0] * len(self.engines)
+        self._round_robin = itertools.cycle(range(len(self.engines)))
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def choose(self) -> int:
+        if self.strategy == "least_inflight":
+            return min(range(len(self.engines)), key=self.in_flight.__getitem__)
+        return next(self._round_robin)
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+replicas = ReplicaSet(DATABASE_REPLICA_URLS, DB_REPLICA_STRATEGY)
+
+# Clients that committed recently read from the primary so they see their own writes.
+# The commit time goes to the client in a cookie, so any worker honours it, also after a
+# token refresh; the per-worker marker covers clients that drop cookies
+_recent_writers = TTLCache(ttl=DB_READ_YOUR_WRITES_SECONDS, max_size=100000)
+
+
+def client_key(request: Request) -> Optional[str]:
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return authorization
+    return request.client.host if request.client else None
+
+
+def wrote_recently(request: Request) -> bool:
+    """Client committed less than DB_READ_YOUR_WRITES_SECONDS ago"""
+    try:
+        wrote_at = float(request.cookies.get(READ_YOUR_WRITES_COOKIE, ""))
+    except ValueError:
+        wrote_at = None
+    # abs() tolerates clock skew between hosts and keeps a forged future time from pinning the primary
+    if wrote_at is not None and abs(time.time() - wrote_at) < DB_READ_YOUR_WRITES_SECONDS:
+        return True
+    key = client_key(request)
+    return bool(key and _recent_writers.get(key))
 
-async def getSession():
+
+def _mark_write(key: Optional[str], response: Response):
+    if key:
+        _recent_writers.set(key, True)
+    response.set_cookie(
+        READ_YOUR_WRITES_COOKIE, f"{time.time():.3f}",
+        max_age=max(int(DB_READ_YOUR_WRITES_SECONDS), 1), httponly=True, samesite="lax"
+    )
+
+
+async def getSession(request: Request, response: Response):
     async with SessionLocal() as session:
+        if replicas:
+            key = client_key(request)
+            event.listen(session.sync_session, "after_commit", lambda _: _mark_write(key, response))
         yield session
 
-class Base(DeclarativeBase):
-    pass
 
+@asynccontextmanager
+async def read_session(use_primary: bool = False):
+    """Session on a read replica, or on the primary when there are none or use_primary is set"""
+    if not replicas or use_primary:
+        async with SessionLocal() as session:
+            yield session
+        return
 
+    index = replicas.choose()
+    replicas.in_flight[index] += 1
+    try:
+        async with replicas.session_makers[index]() as session:
+            yield session
+    finally:
+        replicas.in_flight[index] -= 1
 
 
+async def getReadSession(request: Request):
+    async with read_session(wrote_recently(request)) as session:
+        yield session
 
 
+def all_pool_metrics() -> dict:
+    return {
+        "primary": pool_metrics(engine),
+        "replicas": [
+            {**pool_metrics(replica), "in_flight": replicas.in_flight[i]}
+            for i, replica in enumerate(replicas.engines)
+        ],
+    }
 
 
+class Base(DeclarativeBase):
+    pass
@@ -0,0 +1,52 @@
+"""Baseline schema from src/db/asdf.sql
+
+Databases created from the script before migrations existed already have these
+tables, for them the revision only adds what the script gained later.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from pathlib import Path
+import re
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+SCHEMA_SQL = Path(__file__).resolve().parents[2] / "asdf.sql"
+
+
+def _statements(sql: str):
+    sql = re.sub(r"/\*.*?\*/", "", sql, flags=re.S)
+    sql = re.sub(r"^\s*--.*$", "", sql, flags=re.M)
+    return [statement.strip() for statement in sql.split(";") if statement.strip()]
+
+
+def upgrade():
+    if not context.is_offline_mode():
+        inspector = sa.inspect(op.get_bind())
+        if inspector.has_table("Patent"):
+            if not inspector.has_table("RevokedToken"):
+                op.create_table(
+                    "RevokedToken",
+                    sa.Column("jti", sa.String(), primary_key=True),
+                    sa.Column("expires_at", sa.DateTime(), nullable=False),
+                    sa.PrimaryKeyConstraint("jti", name="PK_RevokedToken"),
+                )
+                op.create_index("IX_RevokedToken_expires_at", "RevokedToken", ["expires_at"])
+            return
+
+    for statement in _statements(SCHEMA_SQL.read_text(encoding="utf-8-sig")):
+        op.execute(statement)
+
+
+def downgrade():
+    for table in (
+        "RevokedToken", "PatentAuthor", "Patent", "PatentType", "RightsHolder", "Application",
+        "Employee", "Status", "Author", "Passport", "Position", "User",
+    ):
+        op.execute(f'DROP TABLE IF EXISTS "{table}" CASCADE')
@@ -0,0 +1,68 @@
+"""Indexes for expiration scans, year grouping, application listings and PatentAuthor lookups
+
+Built CONCURRENTLY so the registry stays writable while they build. The covering
+PatentAuthor indexes replace the plain single column ones from the baseline.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+PATENT_AUTHOR_COLUMNS = ["author_id", "patent_id", "is_rights_holder", "participation_percentage"]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "IX_Patent_expiration_date", "Patent", ["expiration_date"],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            "IX_Patent_issue_date", "Patent", ["issue_date"],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            "IX_Patent_issue_year", "Patent", [sa.text("EXTRACT(year FROM issue_date)")],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            "IX_Application_submission_date", "Application", ["submission_date"],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        for column in ("patent_id", "author_id"):
+            op.create_index(
+                f"IX_PatentAuthor_{column}_covering", "PatentAuthor", [column],
+                postgresql_include=[c for c in PATENT_AUTHOR_COLUMNS if c != column],
+                postgresql_concurrently=True, if_not_exists=True
+            )
+            op.drop_index(
+                f"IX_PatentAuthor_{column}", table_name="PatentAuthor",
+                postgresql_concurrently=True, if_exists=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for column in ("patent_id", "author_id"):
+            op.create_index(
+                f"IX_PatentAuthor_{column}", "PatentAuthor", [column],
+                postgresql_concurrently=True, if_not_exists=True
+            )
+            op.drop_index(
+                f"IX_PatentAuthor_{column}_covering", table_name="PatentAuthor",
+                postgresql_concurrently=True, if_exists=True
+            )
+        for name, table in (
+            ("IX_Application_submission_date", "Application"),
+            ("IX_Patent_issue_year", "Patent"),
+            ("IX_Patent_issue_date", "Patent"),
+            ("IX_Patent_expiration_date", "Patent"),
+        ):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,38 @@
+"""Weighted full-text search vector on Patent with a GIN index
+
+Adding a stored generated column rewrites Patent under an exclusive lock, run it in
+a maintenance window on large registries. The index is built CONCURRENTLY.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
+def upgrade():
+    op.add_column("Patent", sa.Column("search_vector", TSVECTOR, sa.Computed(SEARCH_VECTOR, persisted=True)))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "IX_Patent_search_vector", "Patent", ["search_vector"],
+            postgresql_using="gin", postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade():
+    op.drop_index("IX_Patent_search_vector", table_name="Patent", if_exists=True)
+    op.drop_column("Patent", "search_vector")
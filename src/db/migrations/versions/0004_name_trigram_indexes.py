@@ -0,0 +1,34 @@
+"""pg_trgm GIN indexes for name typeahead on Author, Employee and RightsHolder
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+NAME_COLUMNS = [("Author", "full_name"), ("Employee", "full_name"), ("RightsHolder", "name")]
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for table, column in NAME_COLUMNS:
+            op.create_index(
+                f"IX_{table}_{column}_trgm", table, [column],
+                postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"},
+                postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table, column in NAME_COLUMNS:
+            op.drop_index(
+                f"IX_{table}_{column}_trgm", table_name=table,
+                postgresql_concurrently=True, if_exists=True
+            )
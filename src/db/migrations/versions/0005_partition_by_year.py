@@ -0,0 +1,217 @@
+"""Optional yearly range partitioning of Patent and Application
+
+Runs only with `alembic -x partitioning=on upgrade head` (or DB_PARTITIONING=on), otherwise
+the revision is recorded without changes. To switch it on later, go back and up again:
+    alembic downgrade 0004 && alembic -x partitioning=on upgrade head
+
+The tables are rebuilt, so run it in a maintenance window. A partitioned table can not have
+a unique constraint without the partition key, which means:
+- Patent keeps a primary key on id per partition, ids stay unique through the sequence
+- Application gets PRIMARY KEY (id, submission_date)
+- the foreign keys PatentAuthor -> Patent and Patent -> Application are dropped.
+  PatentAuthor -> Patent is enforced by constraint triggers instead (still RESTRICT), and
+  delete_application removes the patent itself instead of relying on ON DELETE CASCADE
+- src.tools.load refuses to load these two tables, its upserts need a unique index on id
+Future partitions are created and old ones detached by src.db.partitions.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from datetime import date
+import os
+from alembic import context, op
+import sqlalchemy as sa
+from src.db.partitions import PartitionedTable, DB_PARTITION_YEARS_AHEAD
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+PATENT = PartitionedTable("Patent", "issue_date", local_primary_key=True)
+APPLICATION = PartitionedTable("Application", "submission_date", local_primary_key=False)
+
+FOREIGN_KEYS = {
+    "Patent": [
+        ("FK_Patent_RightsHolder", "rights_holder_id", "RightsHolder", "RESTRICT"),
+        ("FK_Patent_PatentType", "patent_type_id", "PatentType", "RESTRICT"),
+        ("FK_Patent_Status", "status_id", "Status", "RESTRICT"),
+    ],
+    "Application": [
+        ("FK_Application_Status", "status_id", "Status", "RESTRICT"),
+        ("FK_Application_Employee", "employee_id", "Employee", "RESTRICT"),
+        ("FK_Application_Author", "author_id", "Author", "RESTRICT"),
+    ],
+}
+
+INDEXES = {
+    "Patent": [
+        ("IX_Patent_rights_holder_id", "(rights_holder_id)"),
+        ("IX_Patent_patent_type_id", "(patent_type_id)"),
+        ("IX_Patent_status_id", "(status_id)"),
+        ("IX_Patent_application_id", "(application_id)"),
+        ("IX_Patent_expiration_date", "(expiration_date)"),
+        ("IX_Patent_issue_date", "(issue_date)"),
+        ("IX_Patent_issue_year", "((EXTRACT(year FROM issue_date)))"),
+        ("IX_Patent_search_vector", "USING gin (search_vector)"),
+    ],
+    "Application": [
+        ("IX_Application_status_id", "(status_id)"),
+        ("IX_Application_employee_id", "(employee_id)"),
+        ("IX_Application_author_id", "(author_id)"),
+        ("IX_Application_submission_date", "(submission_date)"),
+    ],
+}
+
+# Foreign keys into the table that a partitioned table can not serve
+INBOUND_FOREIGN_KEYS = {
+    "Patent": [("PatentAuthor", "FK_PatentAuthor_Patent", "patent_id", "RESTRICT")],
+    "Application": [("Patent", "FK_Patent_Application", "application_id", "CASCADE")],
+}
+
+
+# Stand-in for FK_PatentAuthor_Patent: a patent is found through its partition's primary key
+PATENT_AUTHOR_TRIGGERS = [
+    """
+    CREATE FUNCTION patent_author_check_patent() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        PERFORM 1 FROM "Patent" WHERE id = NEW.patent_id FOR KEY SHARE;
+        IF NOT FOUND THEN
+            RAISE foreign_key_violation USING CONSTRAINT = 'FK_PatentAuthor_Patent',
+                MESSAGE = format('Patent %s referenced by PatentAuthor does not exist', NEW.patent_id);
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE CONSTRAINT TRIGGER "TR_PatentAuthor_patent" AFTER INSERT OR UPDATE OF patent_id ON "PatentAuthor"
+    FOR EACH ROW EXECUTE FUNCTION patent_author_check_patent()
+    """,
+    # A patent moved between partitions (maintain_partitions) still exists under its id
+    """
+    CREATE FUNCTION patent_check_authors() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM "PatentAuthor" WHERE patent_id = OLD.id)
+           AND NOT EXISTS (SELECT 1 FROM "Patent" WHERE id = OLD.id) THEN
+            RAISE foreign_key_violation USING CONSTRAINT = 'FK_PatentAuthor_Patent',
+                MESSAGE = format('Patent %s is still referenced from PatentAuthor', OLD.id);
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER "TR_Patent_authors" AFTER DELETE ON "Patent"
+    FOR EACH ROW EXECUTE FUNCTION patent_check_authors()
+    """,
+]
+
+
+def _enabled() -> bool:
+    value = context.get_x_argument(as_dictionary=True).get("partitioning", os.getenv("DB_PARTITIONING", "off"))
+    return value.lower() in ("1", "on", "true", "yes")
+
+
+def _is_partitioned(table: str) -> bool:
+    return bool(op.get_bind().scalar(
+        sa.text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:name))"),
+        {"name": f'"{table}"'}
+    ))
+
+
+def _copyable_columns(table: str) -> str:
+    columns = op.get_bind().execute(
+        sa.text(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = :table AND is_generated = 'NEVER' ORDER BY ordinal_position"
+        ),
+        {"table": table}
+    ).scalars()
+    return ", ".join(f'"{column}"' for column in columns)
+
+
+def _rebuild(table: str, create_sql: str, after_create, primary_key: str):
+    """Move rows of table into a new table created by create_sql, then restore keys and indexes"""
+    old = f"{table}_old"
+    sequence = op.get_bind().scalar(sa.text(f"SELECT pg_get_serial_sequence('\"{table}\"', 'id')"))
+    for source, name, _, _ in INBOUND_FOREIGN_KEYS[table]:
+        op.execute(f'ALTER TABLE "{source}" DROP CONSTRAINT IF EXISTS "{name}"')
+    op.execute(f'ALTER TABLE "{table}" RENAME TO "{old}"')
+    op.execute(create_sql.format(table=table, old=old))
+    after_create()
+    columns = _copyable_columns(old)
+    op.execute(f'INSERT INTO "{table}" ({columns}) SELECT {columns} FROM "{old}"')
+    op.execute(f'ALTER SEQUENCE {sequence} OWNED BY "{table}".id')
+    op.execute(f'DROP TABLE "{old}"')
+
+    if primary_key:
+        op.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "PK_{table}" PRIMARY KEY ({primary_key})')
+    for name, column, target, on_delete in FOREIGN_KEYS[table]:
+        op.execute(
+            f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" FOREIGN KEY ("{column}") '
+            f'REFERENCES "{target}" ("id") ON DELETE {on_delete} ON UPDATE RESTRICT'
+        )
+    for name, definition in INDEXES[table]:
+        op.execute(f'CREATE INDEX "{name}" ON "{table}" {definition}')
+
+
+def _partition(table: PartitionedTable):
+    years = set(op.get_bind().execute(sa.text(
+        f'SELECT DISTINCT EXTRACT(year FROM "{table.column}")::int FROM "{table.name}" '
+        f'WHERE "{table.column}" IS NOT NULL'
+    )).scalars())
+    this_year = date.today().year
+    years.update(range(this_year, this_year + DB_PARTITION_YEARS_AHEAD + 1))
+
+    def create_partitions():
+        for year in sorted(years):
+            for statement in table.create_partition_sql(year):
+                op.execute(statement)
+        for statement in table.create_default_partition_sql():
+            op.execute(statement)
+
+    _rebuild(
+        table.name,
+        'CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS INCLUDING GENERATED) '
+        f'PARTITION BY RANGE ("{table.column}")',
+        create_partitions,
+        primary_key=None if table.local_primary_key else f'id, "{table.column}"'
+    )
+
+
+def upgrade():
+    if not _enabled() or context.is_offline_mode():
+        return
+    for table in (PATENT, APPLICATION):
+        if not _is_partitioned(table.name):
+            _partition(table)
+            if table is PATENT:
+                for statement in PATENT_AUTHOR_TRIGGERS:
+                    op.execute(statement)
+
+
+def downgrade():
+    if context.is_offline_mode():
+        return
+    # Detached partitions are left alone, their rows do not come back
+    rebuilt = [table.name for table in (APPLICATION, PATENT) if _is_partitioned(table.name)]
+    if PATENT.name in rebuilt:
+        op.execute('DROP TRIGGER IF EXISTS "TR_PatentAuthor_patent" ON "PatentAuthor"')
+        op.execute('DROP TRIGGER IF EXISTS "TR_Patent_authors" ON "Patent"')
+        op.execute("DROP FUNCTION IF EXISTS patent_author_check_patent()")
+        op.execute("DROP FUNCTION IF EXISTS patent_check_authors()")
+    for table in rebuilt:
+        _rebuild(
+            table,
+            'CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS INCLUDING GENERATED)',
+            lambda: None,
+            primary_key="id"
+        )
+    for table in rebuilt:
+        for source, name, column, on_delete in INBOUND_FOREIGN_KEYS[table]:
+            op.execute(
+                f'ALTER TABLE "{source}" ADD CONSTRAINT "{name}" FOREIGN KEY ("{column}") '
+                f'REFERENCES "{table}" ("id") ON DELETE {on_delete} ON UPDATE RESTRICT'
+            )
@@ -0,0 +1,91 @@
+"""Materialized views behind /analytics with trigger-driven dirty flags
+
+Writes to Patent, Application and Author mark the affected views dirty with statement
+level triggers. The API refresher (src/db/crud/analytics.py) refreshes dirty views
+CONCURRENTLY, which needs the unique index on each view.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+VIEWS = {
+    "PatentStatsByTypeYear": (
+        """
+        SELECT patent_type_id, EXTRACT(year FROM issue_date)::int AS year, count(*) AS patent_count
+        FROM "Patent"
+        GROUP BY 1, 2
+        """,
+        ["patent_type_id", "year"],
+    ),
+    "PatentStatsByAuthorYear": (
+        """
+        SELECT a.full_name AS author, EXTRACT(year FROM p.issue_date)::int AS year, count(p.id) AS patent_count
+        FROM "Author" a
+        JOIN "Application" ap ON ap.author_id = a.id
+        JOIN "Patent" p ON p.application_id = ap.id
+        GROUP BY 1, 2
+        """,
+        ["author", "year"],
+    ),
+    "PatentExpirations": (
+        """
+        SELECT expiration_date, count(*) AS patent_count
+        FROM "Patent"
+        GROUP BY 1
+        """,
+        ["expiration_date"],
+    ),
+}
+
+# Views each table feeds
+TRIGGERS = {
+    "Patent": ["PatentStatsByTypeYear", "PatentStatsByAuthorYear", "PatentExpirations"],
+    "Application": ["PatentStatsByAuthorYear"],
+    "Author": ["PatentStatsByAuthorYear"],
+}
+
+
+def upgrade():
+    op.create_table(
+        "AnalyticsRefresh",
+        sa.Column("view_name", sa.String(), nullable=False),
+        sa.Column("dirty", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("refreshed_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("view_name", name="PK_AnalyticsRefresh"),
+    )
+    for name, (query, key) in VIEWS.items():
+        op.execute(f'CREATE MATERIALIZED VIEW "{name}" AS {query}')
+        op.execute(f'CREATE UNIQUE INDEX "UX_{name}" ON "{name}" ({", ".join(key)})')
+        op.execute(sa.text('INSERT INTO "AnalyticsRefresh" (view_name) VALUES (:name)').bindparams(name=name))
+
+    op.execute("""
+        CREATE FUNCTION analytics_mark_dirty() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE "AnalyticsRefresh" SET dirty = true WHERE view_name = ANY(TG_ARGV) AND NOT dirty;
+            RETURN NULL;
+        END
+        $$
+    """)
+    for table, views in TRIGGERS.items():
+        arguments = ", ".join(f"'{view}'" for view in views)
+        op.execute(
+            f'CREATE TRIGGER "TR_{table}_analytics" AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "{table}" '
+            f"FOR EACH STATEMENT EXECUTE FUNCTION analytics_mark_dirty({arguments})"
+        )
+
+
+def downgrade():
+    for table in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS "TR_{table}_analytics" ON "{table}"')
+    op.execute("DROP FUNCTION IF EXISTS analytics_mark_dirty()")
+    for name in VIEWS:
+        op.execute(f'DROP MATERIALIZED VIEW IF EXISTS "{name}"')
+    op.drop_table("AnalyticsRefresh")
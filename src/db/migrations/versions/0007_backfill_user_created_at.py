@@ -0,0 +1,22 @@
+"""Backfill User.created_at left NULL by /auth/register
+
+The real registration time is unknown, the migration time is the closest bound we have.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""UPDATE "User" SET created_at = timezone('UTC', now()) WHERE created_at IS NULL""")
+
+
+def downgrade():
+    pass
@@ -0,0 +1,34 @@
+"""Checkpoints of the offline loader (src/tools/load.py)
+
+The loader writes its position in the same transaction as each batch, so a crash can not
+leave rows committed that the checkpoint does not cover.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "LoadCheckpoint",
+        sa.Column("table_name", sa.String(), nullable=False),
+        sa.Column("source", sa.String(), nullable=False),
+        sa.Column("records", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("loaded", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("skipped", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("done", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("table_name", "source", name="PK_LoadCheckpoint"),
+    )
+
+
+def downgrade():
+    op.drop_table("LoadCheckpoint")
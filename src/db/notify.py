@@ -0,0 +1,63 @@
+from collections import defaultdict
+from typing import Callable, Optional
+import logging
+import os
+import asyncpg
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.db.database import engine, asyncpg_dsn
+
+logger = logging.getLogger(__name__)
+
+# Each worker keeps one extra connection for LISTEN; it needs a session-level connection, so
+# turn it off behind a transaction-pooling pgbouncer. Without it, token revocations reach other
+# workers only at their next rebuild (REVOCATION_PRUNE_INTERVAL) and their caches live out their TTL
+DB_NOTIFY_ENABLED = os.getenv("DB_NOTIFY_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+class NotificationListener:
+    """
+    Dedicated asyncpg connection that dispatches LISTEN/NOTIFY payloads to callbacks
+    Used to keep per-worker caches consistent across uvicorn workers
+    """
+
+    def __init__(self):
+        self._callbacks: dict[str, list[Callable[[str], None]]] = defaultdict(list)
+        self._connection: Optional[asyncpg.Connection] = None
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]):
+        self._callbacks[channel].append(callback)
+
+    def _dispatch(self, connection, pid, channel, payload):
+        for callback in self._callbacks.get(channel, ()):
+            try:
+                callback(payload)
+            except Exception:
+                logger.exception("Notification callback for %s failed", channel)
+
+    async def start(self):
+        if self._connection is not None:
+            return
+        self._connection = await asyncpg.connect(asyncpg_dsn(engine))
+        self._connection.add_termination_listener(self._terminated)
+        for channel in self._callbacks:
+            await self._connection.add_listener(channel, self._dispatch)
+
+    def _terminated(self, connection):
+        # Notifications sent from now on are lost, revocations wait for the next rebuild
+        logger.error("Notification listener connection closed, cross-worker invalidation stopped")
+
+    async def stop(self):
+        if self._connection is not None:
+            self._connection.remove_termination_listener(self._terminated)
+            await self._connection.close()
+            self._connection = None
+
+
+listener = NotificationListener()
+
+
+async def notify(session: AsyncSession, channel: str, payload: str):
+    """Queue a notification, delivered by Postgres when the session commits"""
+    if DB_NOTIFY_ENABLED:
+        await session.execute(select(func.pg_notify(channel, payload)))
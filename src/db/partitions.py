@@ -0,0 +1,185 @@
+"""
+Yearly range partitions of Patent (by issue_date) and Application (by submission_date)
+Partitioning is optional: migration 0005 converts the tables only when run with
+`alembic -x partitioning=on upgrade head`. On plain tables everything here is a no-op
+"""
+from datetime import date
+from typing import Optional
+import asyncio
+import logging
+import os
+import re
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from src.db.database import engine
+
+logger = logging.getLogger(__name__)
+
+DB_PARTITION_YEARS_AHEAD = int(os.getenv("DB_PARTITION_YEARS_AHEAD", 2))
+DB_PARTITION_RETAIN_YEARS = int(os.getenv("DB_PARTITION_RETAIN_YEARS", 0))  # 0 keeps every year attached
+DB_PARTITION_MAINTENANCE_INTERVAL = int(os.getenv("DB_PARTITION_MAINTENANCE_INTERVAL", 86400))
+
+# Any constant works as long as nothing else takes the same advisory lock
+MAINTENANCE_LOCK_ID = 0x70617274
+
+
+class PartitionedTable:
+    """
+    Table partitioned by year on a date column
+    Patent.issue_date is nullable, so it can not be part of a primary key on the parent;
+    each Patent partition gets its own primary key on id instead
+    """
+
+    def __init__(self, name: str, column: str, local_primary_key: bool):
+        self.name = name
+        self.column = column
+        self.local_primary_key = local_primary_key
+
+    def partition(self, year: int) -> str:
+        return f"{self.name}_y{year}"
+
+    @property
+    def default_partition(self) -> str:
+        return f"{self.name}_default"
+
+    def create_partition_sql(self, year: int) -> list[str]:
+        name = self.partition(year)
+        statements = [
+            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{self.name}" '
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+        ]
+        if self.local_primary_key:
+            statements.append(_add_primary_key_sql(name))
+        return statements
+
+    def year_range(self, year: int) -> str:
+        return f""""{self.column}" >= '{year}-01-01' AND "{self.column}" < '{year + 1}-01-01'"""
+
+    def move_from_default_sql(self, year: int, columns: str) -> list[str]:
+        """
+        Create the partition of year when the default partition already holds rows of it
+        PostgreSQL refuses to attach a range the default partition has rows for, so the
+        default is detached while its rows of that year are moved over
+        """
+        default = self.default_partition
+        return [
+            f'ALTER TABLE "{self.name}" DETACH PARTITION "{default}"',
+            *self.create_partition_sql(year),
+            f'INSERT INTO "{self.name}" ({columns}) SELECT {columns} FROM "{default}" WHERE {self.year_range(year)}',
+            f'DELETE FROM "{default}" WHERE {self.year_range(year)}',
+            f'ALTER TABLE "{self.name}" ATTACH PARTITION "{default}" DEFAULT',
+        ]
+
+    def create_default_partition_sql(self) -> list[str]:
+        name = self.default_partition
+        statements = [f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{self.name}" DEFAULT']
+        if self.local_primary_key:
+            statements.append(_add_primary_key_sql(name))
+        return statements
+
+
+def _add_primary_key_sql(table: str) -> str:
+    return (
+        f"DO $$ BEGIN "
+        f"IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'PK_{table}') THEN "
+        f'ALTER TABLE "{table}" ADD CONSTRAINT "PK_{table}" PRIMARY KEY (id); '
+        f"END IF; END $$"
+    )
+
+
+PARTITIONED_TABLES = [
+    PartitionedTable("Patent", "issue_date", local_primary_key=True),
+    PartitionedTable("Application", "submission_date", local_primary_key=False),
+]
+
+
+async def is_partitioned(conn: AsyncConnection, table: str) -> bool:
+    return bool(await conn.scalar(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:name))"),
+        {"name": f'"{table}"'}
+    ))
+
+
+async def attached_years(conn: AsyncConnection, table: PartitionedTable) -> list[int]:
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:name)"
+        ),
+        {"name": f'"{table.name}"'}
+    )
+    pattern = re.compile(rf"^{re.escape(table.name)}_y(\d{{4}})$")
+    return sorted(int(match.group(1)) for match in map(pattern.match, result.scalars()) if match)
+
+
+async def _default_has_rows(conn: AsyncConnection, table: PartitionedTable, year: int) -> bool:
+    if not await conn.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": f'"{table.default_partition}"'}):
+        return False
+    return bool(await conn.scalar(text(
+        f'SELECT EXISTS (SELECT 1 FROM "{table.default_partition}" WHERE {table.year_range(year)})'
+    )))
+
+
+async def _copyable_columns(conn: AsyncConnection, table: str) -> str:
+    result = await conn.execute(
+        text(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = :table AND is_generated = 'NEVER' ORDER BY ordinal_position"
+        ),
+        {"table": table}
+    )
+    return ", ".join(f'"{column}"' for column in result.scalars())
+
+
+async def maintain_partitions(
+    conn: AsyncConnection,
+    years_ahead: int = DB_PARTITION_YEARS_AHEAD,
+    retain_years: int = DB_PARTITION_RETAIN_YEARS,
+    dry_run: bool = False,
+    today: Optional[date] = None
+) -> list[str]:
+    """
+    Create partitions up to years_ahead years from now and detach ones older than
+    retain_years. Rows of a new year already in the default partition are moved into it.
+    Detached partitions stay as plain tables for archiving or dropping.
+    Returns the statements run (or that would run, with dry_run)
+    """
+    today = today or date.today()
+    if not await conn.scalar(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": MAINTENANCE_LOCK_ID}):
+        logger.info("Partition maintenance is running elsewhere, skipping")
+        return []
+
+    statements = []
+    for table in PARTITIONED_TABLES:
+        if not await is_partitioned(conn, table.name):
+            continue
+        years = await attached_years(conn, table)
+        for year in range(today.year, today.year + years_ahead + 1):
+            if year in years:
+                continue
+            if await _default_has_rows(conn, table, year):
+                statements.extend(table.move_from_default_sql(year, await _copyable_columns(conn, table.name)))
+            else:
+                statements.extend(table.create_partition_sql(year))
+        if retain_years:
+            oldest_kept = today.year - retain_years + 1
+            statements.extend(
+                f'ALTER TABLE "{table.name}" DETACH PARTITION "{table.partition(year)}"'
+                for year in years if year < oldest_kept
+            )
+
+    if not dry_run:
+        for statement in statements:
+            await conn.execute(text(statement))
+    return statements
+
+
+async def run_partition_maintenance(interval: int = DB_PARTITION_MAINTENANCE_INTERVAL):
+    while True:
+        try:
+            async with engine.begin() as conn:
+                for statement in await maintain_partitions(conn):
+                    logger.info("Partition maintenance: %s", statement)
+        except Exception:
+            logger.exception("Partition maintenance failed")
+        await asyncio.sleep(interval)
@@ -1,19 +1,69 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import asyncio
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 import uvicorn
 from src.api import auth
 from src.api import application
 from src.api import patent
 from src.api import analytics
 from src.api import reference
+from src.api import metrics
+from src.core.security import PasswordHasherBusy, shutdown_password_hasher
+from src.db.notify import DB_NOTIFY_ENABLED, listener
+from src.db.database import SessionLocal
+from src.db.crud.token import load_revoked_tokens, run_revocation_pruner
+from src.db.partitions import run_partition_maintenance, DB_PARTITION_MAINTENANCE_INTERVAL
+from src.db.crud.analytics import run_summary_refresher, ANALYTICS_REFRESH_INTERVAL
+from src.db.crud.pagination import InvalidCursor
+from src.db.crud.filters import InvalidFilter
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if DB_NOTIFY_ENABLED:
+        await listener.start()
+    async with SessionLocal() as session:
+        await load_revoked_tokens(session)
+    tasks = [asyncio.create_task(run_revocation_pruner())]
+    if DB_PARTITION_MAINTENANCE_INTERVAL > 0:
+        tasks.append(asyncio.create_task(run_partition_maintenance()))
+    if ANALYTICS_REFRESH_INTERVAL > 0:
+        tasks.append(asyncio.create_task(run_summary_refresher()))
+    yield
+    for task in tasks:
+        task.cancel()
+    await listener.stop()
+    shutdown_password_hasher()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(application.router, prefix="/applications", tags=["applications"])
 app.include_router(patent.router, prefix="/patents", tags=["patents"])
 app.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
 app.include_router(reference.router, prefix="/reference", tags=["reference"])
+app.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
+
+
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.exception_handler(InvalidFilter)
+async def invalid_filter_handler(request: Request, exc: InvalidFilter):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, try again later"},
+        headers={"Retry-After": "1"},
+    )
 
 
 @app.get("/")
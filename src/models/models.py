@@ -1,6 +1,7 @@
 from src.db.database import Base
 from sqlalchemy import *
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from datetime import datetime
 
 
@@ -47,6 +48,9 @@ class Passport(Base):
 
 class Author(Base):
     __tablename__ = "Author"
+    __table_args__ = (
+        Index("IX_Author_full_name_trgm", "full_name", postgresql_using="gin", postgresql_ops={"full_name": "gin_trgm_ops"}),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     full_name = Column(String, nullable=False)
@@ -68,6 +72,9 @@ class Status(Base):
 
 class Employee(Base):
     __tablename__ = "Employee"
+    __table_args__ = (
+        Index("IX_Employee_full_name_trgm", "full_name", postgresql_using="gin", postgresql_ops={"full_name": "gin_trgm_ops"}),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     full_name = Column(String, nullable=False)
@@ -84,6 +91,12 @@ class Employee(Base):
 
 class Application(Base):
     __tablename__ = "Application"
+    __table_args__ = (
+        Index("IX_Application_status_id", "status_id"),
+        Index("IX_Application_employee_id", "employee_id"),
+        Index("IX_Application_author_id", "author_id"),
+        Index("IX_Application_submission_date", "submission_date"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     submission_date = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -102,6 +115,9 @@ class Application(Base):
 
 class RightsHolder(Base):
     __tablename__ = "RightsHolder"
+    __table_args__ = (
+        Index("IX_RightsHolder_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, nullable=False)
@@ -118,8 +134,26 @@ class PatentType(Base):
     patents = relationship("Patent", back_populates="patent_type")
 
 
+PATENT_SEARCH_VECTOR = (
+    "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
 class Patent(Base):
     __tablename__ = "Patent"
+    __table_args__ = (
+        Index("IX_Patent_rights_holder_id", "rights_holder_id"),
+        Index("IX_Patent_patent_type_id", "patent_type_id"),
+        Index("IX_Patent_status_id", "status_id"),
+        Index("IX_Patent_application_id", "application_id"),
+        Index("IX_Patent_expiration_date", "expiration_date"),
+        Index("IX_Patent_issue_date", "issue_date"),
+        Index("IX_Patent_issue_year", extract("year", text("issue_date"))),
+        Index("IX_Patent_search_vector", "search_vector", postgresql_using="gin"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String)
@@ -130,6 +164,8 @@ class Patent(Base):
     patent_type_id = Column(Integer, ForeignKey("PatentType.id", ondelete="RESTRICT", onupdate="RESTRICT"))
     status_id = Column(Integer, ForeignKey("Status.id", ondelete="RESTRICT", onupdate="RESTRICT"))
     application_id = Column(Integer, ForeignKey("Application.id", ondelete="CASCADE", onupdate="RESTRICT"), nullable=False)
+    # Maintained by PostgreSQL, title weighs more than description
+    search_vector = deferred(Column(TSVECTOR, Computed(PATENT_SEARCH_VECTOR, persisted=True)))
     
     rights_holder = relationship("RightsHolder", back_populates="patents")
     patent_type = relationship("PatentType", back_populates="patents")
@@ -140,11 +176,50 @@ class Patent(Base):
 
 class PatentAuthor(Base):
     __tablename__ = "PatentAuthor"
+    __table_args__ = (
+        Index(
+            "IX_PatentAuthor_patent_id_covering", "patent_id",
+            postgresql_include=["author_id", "is_rights_holder", "participation_percentage"]
+        ),
+        Index(
+            "IX_PatentAuthor_author_id_covering", "author_id",
+            postgresql_include=["patent_id", "is_rights_holder", "participation_percentage"]
+        ),
+    )
     
     author_id = Column(Integer, ForeignKey("Author.id", ondelete="CASCADE", onupdate="RESTRICT"), primary_key=True)
+    # With partitioning (migration 0005) this foreign key is replaced by triggers with the same RESTRICT check
     patent_id = Column(Integer, ForeignKey("Patent.id", ondelete="RESTRICT", onupdate="RESTRICT"), primary_key=True)
     is_rights_holder = Column(Boolean, default=False)
     participation_percentage = Column(Numeric(5, 2))
     
     author = relationship("Author", back_populates="patent_authors")
     patent = relationship("Patent", back_populates="patent_authors")
+
+
+class RevokedToken(Base):
+    __tablename__ = "RevokedToken"
+    __table_args__ = (Index("IX_RevokedToken_expires_at", "expires_at"),)
+    
+    jti = Column(String, primary_key=True)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class AnalyticsRefresh(Base):
+    __tablename__ = "AnalyticsRefresh"
+    
+    view_name = Column(String, primary_key=True)
+    dirty = Column(Boolean, nullable=False, server_default=false())
+    refreshed_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+class LoadCheckpoint(Base):
+    __tablename__ = "LoadCheckpoint"
+    
+    table_name = Column(String, primary_key=True)
+    source = Column(String, primary_key=True)
+    records = Column(BigInteger, nullable=False, server_default="0")
+    loaded = Column(BigInteger, nullable=False, server_default="0")
+    skipped = Column(BigInteger, nullable=False, server_default="0")
+    done = Column(Boolean, nullable=False, server_default=false())
+    updated_at = Column(DateTime, nullable=False, server_default=func.now())
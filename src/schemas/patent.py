@@ -187,6 +187,16 @@ class Patent(PatentBase):
 
 
 
+class Suggestion(BaseModel):
+    id: int
+    name: str
+
+
+class PatentSearchResult(Patent):
+    rank: float
+    snippet: Optional[str] = None
+
+
 class PatentAuthorBase(BaseModel):
     is_rights_holder: bool = False
     participation_percentage: Optional[float] = None
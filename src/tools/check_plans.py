@@ -0,0 +1,125 @@
+"""
+EXPLAIN checks for the hot queries
+
+    python -m src.tools.check_plans --rows 200000
+
+Fills the registry tables with synthetic rows inside a transaction, analyzes them and
+fails when a hot query is planned as a sequential scan over Patent, Application or
+PatentAuthor. The transaction is rolled back, so a development database is left as it was.
+tests/test_query_plans.py runs the same check under pytest.
+"""
+from datetime import date
+import argparse
+import asyncio
+import json
+import sys
+from sqlalchemy import select, func, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncConnection
+from src.db.database import engine
+from src.db.crud.pagination import paginate
+from src.db.crud.patent import expired_by
+from src.models.models import Patent, Application, PatentAuthor
+
+CHECKED_TABLES = {"Patent", "Application", "PatentAuthor"}
+
+
+def hot_queries(sample_patent_id: int, sample_author_id: int) -> dict:
+    today = date.today()
+    return {
+        "expired patents": select(Patent).where(expired_by(today)),
+        "expired patent count": select(func.count(Patent.id)).where(expired_by(today)),
+        "patents issued in a year": select(Patent.id).where(func.extract("year", Patent.issue_date) == today.year - 1),
+        "patent page": paginate(select(Patent), Patent, 100),
+        "applications by submission date": paginate(
+            select(Application), Application, 100, sort_column=Application.submission_date
+        ),
+        "authors of a patent": select(PatentAuthor).where(PatentAuthor.patent_id == sample_patent_id),
+        "patents of an author": select(PatentAuthor).where(PatentAuthor.author_id == sample_author_id),
+    }
+
+
+SEED = [
+    """
+    INSERT INTO "Application" (submission_date, modification_date)
+    SELECT now() - (g % 7665) * interval '1 day', now() FROM generate_series(1, :rows) g
+    """,
+    # Issue dates over the last 21 years with a 20 year term, so about 5% have expired
+    """
+    WITH holder AS (INSERT INTO "RightsHolder" (name) VALUES ('Synthetic rights holder') RETURNING id)
+    INSERT INTO "Patent" (title, issue_date, expiration_date, rights_holder_id, application_id)
+    SELECT 'Synthetic patent ' || a.id, a.issued, a.issued + interval '20 years', holder.id, a.id
+    FROM (SELECT id, current_date - (random() * 7665)::int AS issued FROM "Application" WHERE id > :application_id) a
+    CROSS JOIN holder
+    """,
+    """
+    INSERT INTO "Author" (full_name)
+    SELECT 'Synthetic author ' || g FROM generate_series(1, GREATEST(:rows / 10, 2)) g
+    """,
+    """
+    INSERT INTO "PatentAuthor" (author_id, patent_id, is_rights_holder, participation_percentage)
+    SELECT a.first_id + (p.id * 7 + k) % a.n, p.id, false, 50
+    FROM "Patent" p
+    CROSS JOIN generate_series(0, 1) k
+    CROSS JOIN (SELECT MIN(id) AS first_id, COUNT(*) AS n FROM "Author" WHERE id > :author_id) a
+    WHERE p.id > :patent_id
+    """,
+]
+
+
+def _seq_scans(plan: dict):
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in CHECKED_TABLES:
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from _seq_scans(child)
+
+
+async def seq_scans_of_hot_queries(conn: AsyncConnection, rows: int) -> dict[str, tuple[str, list[str]]]:
+    """
+    Seed rows synthetic rows on conn and EXPLAIN every hot query
+    Returns the top plan node and the checked tables scanned sequentially, per query.
+    The caller owns the transaction and is expected to roll it back
+    """
+    start = {
+        name: await conn.scalar(text(f'SELECT COALESCE(MAX(id), 0) FROM "{table}"'))
+        for name, table in (("application_id", "Application"), ("patent_id", "Patent"), ("author_id", "Author"))
+    }
+    for statement in SEED:
+        await conn.execute(text(statement), {"rows": rows, **start})
+    for table in ("Application", "Patent", "Author", "PatentAuthor"):
+        await conn.execute(text(f'ANALYZE "{table}"'))
+
+    plans = {}
+    for name, query in hot_queries(start["patent_id"] + rows // 2, start["author_id"] + 1).items():
+        sql = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+        plan = await conn.scalar(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        plans[name] = (plan[0]["Plan"]["Node Type"], sorted(set(_seq_scans(plan[0]["Plan"]))))
+    return plans
+
+
+async def check(rows: int) -> bool:
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            plans = await seq_scans_of_hot_queries(conn, rows)
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+
+    for name, (node_type, scans) in plans.items():
+        status = f"seq scan on {', '.join(scans)}" if scans else "ok"
+        print(f"{name:36} {node_type:24} {status}")
+    return not any(scans for _, scans in plans.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when hot queries plan sequential scans")
+    parser.add_argument("--rows", type=int, default=200000, help="synthetic patents and applications to add")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(check(args.rows)) else 1)
+
+
+if __name__ == "__main__":
+    main()
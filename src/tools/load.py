@@ -0,0 +1,336 @@
+"""
+Offline loader for historical registry data
+
+    python -m src.tools.load patent patents.csv
+    python -m src.tools.load patentauthor links.ndjson --batch-size 50000
+
+Each batch is copied into a temporary staging table with COPY, foreign keys are
+resolved set-based against the live tables (names of statuses, patent types and
+rights holders may be given instead of ids) and the rows are upserted by key.
+Rows whose required parents do not exist are skipped, as are NDJSON lines that are not a
+JSON object. Patent and Application can not be loaded once they are partitioned (migration 0005),
+there is no key to upsert by. The position is saved in "LoadCheckpoint" (migration 0008) in the
+same transaction as every batch, so a rerun resumes exactly after the last committed batch.
+Pass --restart to load a source again from the start.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterator, Optional
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+import asyncpg
+from src.db.database import engine, asyncpg_dsn
+
+
+@dataclass
+class TableSpec:
+    target: str
+    columns: list[tuple[str, str]]
+    key: list[str]
+    upsert: str
+    prepare: tuple[str, ...] = ()
+    serial: bool = True
+
+    @property
+    def stage(self) -> str:
+        return f"stage_{self.target.lower()}"
+
+
+def _serial_id(table: str) -> str:
+    return f"COALESCE(s.id, nextval(pg_get_serial_sequence('\"{table}\"', 'id')))"
+
+
+def _name_lookup(table: str, alias: str, name_column: str, stage_column: str) -> str:
+    return (
+        f'LEFT JOIN LATERAL (SELECT id FROM "{table}" WHERE {name_column} = s.{stage_column} '
+        f'ORDER BY id LIMIT 1) {alias} ON s.{stage_column}_id IS NULL'
+    )
+
+
+SPECS = {
+    "rightsholder": TableSpec(
+        target="RightsHolder",
+        columns=[("id", "integer"), ("name", "text")],
+        key=["id"],
+        upsert=f"""
+            INSERT INTO "RightsHolder" (id, name)
+            SELECT {_serial_id("RightsHolder")}, s.name FROM stage_rightsholder s
+            WHERE s.name IS NOT NULL
+            ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name
+        """,
+    ),
+    "author": TableSpec(
+        target="Author",
+        columns=[("id", "integer"), ("full_name", "text"), ("passport_id", "integer")],
+        key=["id"],
+        upsert=f"""
+            INSERT INTO "Author" (id, full_name, passport_id)
+            SELECT {_serial_id("Author")}, s.full_name, s.passport_id FROM stage_author s
+            WHERE s.full_name IS NOT NULL
+              AND (s.passport_id IS NULL OR EXISTS (SELECT 1 FROM "Passport" p WHERE p.id = s.passport_id))
+            ON CONFLICT (id) DO UPDATE SET full_name = EXCLUDED.full_name, passport_id = EXCLUDED.passport_id
+        """,
+    ),
+    "application": TableSpec(
+        target="Application",
+        columns=[
+            ("id", "integer"), ("submission_date", "timestamp"), ("documents", "text"),
+            ("modification_date", "timestamp"), ("expert_conclusion", "text"),
+            ("status_id", "integer"), ("status", "text"),
+            ("employee_id", "integer"), ("author_id", "integer"),
+        ],
+        key=["id"],
+        upsert=f"""
+            INSERT INTO "Application" (id, submission_date, documents, modification_date,
+                                       expert_conclusion, status_id, employee_id, author_id)
+            SELECT {_serial_id("Application")}, COALESCE(s.submission_date, now()), s.documents,
+                   s.modification_date, s.expert_conclusion, COALESCE(s.status_id, st.id),
+                   s.employee_id, s.author_id
+            FROM stage_application s
+            {_name_lookup("Status", "st", "name", "status")}
+            WHERE (s.status_id IS NULL OR EXISTS (SELECT 1 FROM "Status" x WHERE x.id = s.status_id))
+              AND (s.employee_id IS NULL OR EXISTS (SELECT 1 FROM "Employee" e WHERE e.id = s.employee_id))
+              AND (s.author_id IS NULL OR EXISTS (SELECT 1 FROM "Author" a WHERE a.id = s.author_id))
+            ON CONFLICT (id) DO UPDATE SET
+                submission_date = EXCLUDED.submission_date, documents = EXCLUDED.documents,
+                modification_date = EXCLUDED.modification_date,
+                expert_conclusion = EXCLUDED.expert_conclusion, status_id = EXCLUDED.status_id,
+                employee_id = EXCLUDED.employee_id, author_id = EXCLUDED.author_id
+        """,
+    ),
+    "patent": TableSpec(
+        target="Patent",
+        columns=[
+            ("id", "integer"), ("title", "text"), ("issue_date", "date"),
+            ("expiration_date", "date"), ("description", "text"),
+            ("rights_holder_id", "integer"), ("rights_holder", "text"),
+            ("patent_type_id", "integer"), ("patent_type", "text"),
+            ("status_id", "integer"), ("status", "text"), ("application_id", "integer"),
+        ],
+        key=["id"],
+        prepare=(
+            """
+            INSERT INTO "RightsHolder" (name)
+            SELECT DISTINCT s.rights_holder FROM stage_patent s
+            WHERE s.rights_holder_id IS NULL AND s.rights_holder IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM "RightsHolder" r WHERE r.name = s.rights_holder)
+            """,
+        ),
+        upsert=f"""
+            INSERT INTO "Patent" (id, title, issue_date, expiration_date, description,
+                                  rights_holder_id, patent_type_id, status_id, application_id)
+            SELECT {_serial_id("Patent")}, s.title, s.issue_date, s.expiration_date, s.description,
+                   COALESCE(s.rights_holder_id, rh.id), COALESCE(s.patent_type_id, pt.id),
+                   COALESCE(s.status_id, st.id), s.application_id
+            FROM stage_patent s
+            JOIN "Application" a ON a.id = s.application_id
+            {_name_lookup("RightsHolder", "rh", "name", "rights_holder")}
+            {_name_lookup("PatentType", "pt", "name", "patent_type")}
+            {_name_lookup("Status", "st", "name", "status")}
+            WHERE (s.rights_holder_id IS NULL OR EXISTS (SELECT 1 FROM "RightsHolder" r WHERE r.id = s.rights_holder_id))
+              AND (s.patent_type_id IS NULL OR EXISTS (SELECT 1 FROM "PatentType" t WHERE t.id = s.patent_type_id))
+              AND (s.status_id IS NULL OR EXISTS (SELECT 1 FROM "Status" x WHERE x.id = s.status_id))
+            ON CONFLICT (id) DO UPDATE SET
+                title = EXCLUDED.title, issue_date = EXCLUDED.issue_date,
+                expiration_date = EXCLUDED.expiration_date, description = EXCLUDED.description,
+                rights_holder_id = EXCLUDED.rights_holder_id, patent_type_id = EXCLUDED.patent_type_id,
+                status_id = EXCLUDED.status_id, application_id = EXCLUDED.application_id
+        """,
+    ),
+    "patentauthor": TableSpec(
+        target="PatentAuthor",
+        columns=[
+            ("author_id", "integer"), ("patent_id", "integer"),
+            ("is_rights_holder", "boolean"), ("participation_percentage", "numeric"),
+        ],
+        key=["author_id", "patent_id"],
+        serial=False,
+        upsert="""
+            INSERT INTO "PatentAuthor" (author_id, patent_id, is_rights_holder, participation_percentage)
+            SELECT s.author_id, s.patent_id, COALESCE(s.is_rights_holder, false), s.participation_percentage
+            FROM stage_patentauthor s
+            JOIN "Author" a ON a.id = s.author_id
+            JOIN "Patent" p ON p.id = s.patent_id
+            ON CONFLICT (author_id, patent_id) DO UPDATE SET
+                is_rights_holder = EXCLUDED.is_rights_holder,
+                participation_percentage = EXCLUDED.participation_percentage
+        """,
+    ),
+}
+
+
+def _parse_bool(value: str) -> bool:
+    return value.strip().lower() in ("1", "t", "true", "yes", "y")
+
+
+PARSERS = {
+    "integer": int,
+    "text": str,
+    "date": date.fromisoformat,
+    "timestamp": datetime.fromisoformat,
+    "numeric": lambda value: Decimal(str(value)),
+    "boolean": lambda value: value if isinstance(value, bool) else _parse_bool(value),
+}
+
+
+def read_records(path: str, fmt: str) -> Iterator[Optional[dict]]:
+    """Records of the source file, None for an NDJSON line that is not a JSON object"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    record = None
+                yield record if isinstance(record, dict) else None
+
+
+def to_stage_row(spec: TableSpec, record: Optional[dict], line: int) -> Optional[tuple]:
+    if record is None:
+        return None
+    row = []
+    for name, pg_type in spec.columns:
+        value = record.get(name)
+        if value is None or value == "":
+            row.append(None)
+            continue
+        try:
+            row.append(PARSERS[pg_type](value))
+        except (TypeError, ValueError, ArithmeticError):
+            return None
+    row.append(line)
+    return tuple(row)
+
+
+async def load_checkpoint(conn: asyncpg.Connection, table: str, source: str) -> dict:
+    row = await conn.fetchrow(
+        'SELECT records, loaded, skipped, done FROM "LoadCheckpoint" WHERE table_name = $1 AND source = $2',
+        table, source
+    )
+    if row is None:
+        return {"records": 0, "loaded": 0, "skipped": 0, "done": False}
+    return dict(row)
+
+
+async def save_checkpoint(conn: asyncpg.Connection, table: str, source: str, checkpoint: dict):
+    await conn.execute(
+        """
+        INSERT INTO "LoadCheckpoint" (table_name, source, records, loaded, skipped, done, updated_at)
+        VALUES ($1, $2, $3, $4, $5, $6, now())
+        ON CONFLICT (table_name, source) DO UPDATE SET
+            records = EXCLUDED.records, loaded = EXCLUDED.loaded, skipped = EXCLUDED.skipped,
+            done = EXCLUDED.done, updated_at = EXCLUDED.updated_at
+        """,
+        table, source, checkpoint["records"], checkpoint["loaded"], checkpoint["skipped"], checkpoint["done"]
+    )
+
+
+async def load(table: str, source: str, fmt: str, batch_size: int, restart: bool = False):
+    spec = SPECS[table]
+    source_key = os.path.abspath(source)
+    stage_columns = [name for name, _ in spec.columns] + ["_line"]
+    column_ddl = ", ".join(f"{name} {pg_type}" for name, pg_type in spec.columns)
+    key_match = " AND ".join(f"s.{column} = d.{column}" for column in spec.key)
+
+    conn = await asyncpg.connect(asyncpg_dsn(engine))
+    try:
+        if await conn.fetchval(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass($1))",
+            f'"{spec.target}"'
+        ):
+            raise SystemExit(
+                f"{spec.target} is partitioned by year (migration 0005) and has no unique index on id "
+                f"to upsert by. Load it before partitioning, or run `alembic downgrade 0004` first"
+            )
+        if restart:
+            await conn.execute(
+                'DELETE FROM "LoadCheckpoint" WHERE table_name = $1 AND source = $2', table, source_key
+            )
+        checkpoint = await load_checkpoint(conn, table, source_key)
+        if checkpoint["done"]:
+            print(f"{source} is already loaded, pass --restart to load it again", file=sys.stderr)
+            return
+        await conn.execute(
+            f"CREATE TEMP TABLE {spec.stage} ({column_ddl}, _line bigint) ON COMMIT DELETE ROWS"
+        )
+        records = itertools.islice(read_records(source, fmt), checkpoint["records"], None)
+        line = checkpoint["records"]
+        started = time.monotonic()
+        loaded_now = 0
+
+        while True:
+            batch = list(itertools.islice(records, batch_size))
+            if not batch:
+                break
+            rows = []
+            for record in batch:
+                line += 1
+                row = to_stage_row(spec, record, line)
+                if row is not None:
+                    rows.append(row)
+
+            async with conn.transaction():
+                await conn.copy_records_to_table(spec.stage, records=rows, columns=stage_columns)
+                # Last occurrence of a key in the batch wins
+                await conn.execute(
+                    f"DELETE FROM {spec.stage} s USING {spec.stage} d WHERE {key_match} AND s._line < d._line"
+                )
+                for statement in spec.prepare:
+                    await conn.execute(statement)
+                status = await conn.execute(spec.upsert)
+                loaded = int(status.split()[-1])
+                if spec.serial:
+                    await conn.execute(
+                        f"SELECT setval(pg_get_serial_sequence('\"{spec.target}\"', 'id'), "
+                        f"GREATEST((SELECT MAX(id) FROM \"{spec.target}\"), 1))"
+                    )
+                # Saved with the batch: rows without an id would be inserted twice if a crash
+                # could leave the batch committed and the checkpoint behind
+                checkpoint = {
+                    **checkpoint,
+                    "records": line,
+                    "loaded": checkpoint["loaded"] + loaded,
+                    "skipped": checkpoint["skipped"] + len(batch) - loaded,
+                }
+                await save_checkpoint(conn, table, source_key, checkpoint)
+
+            loaded_now += len(batch)
+            rate = loaded_now / max(time.monotonic() - started, 1e-6)
+            print(
+                f"{spec.target}: {checkpoint['records']} records read, {checkpoint['loaded']} loaded, "
+                f"{checkpoint['skipped']} skipped, {rate:.0f} records/s",
+                file=sys.stderr
+            )
+
+        checkpoint["done"] = True
+        await save_checkpoint(conn, table, source_key, checkpoint)
+    finally:
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load CSV/NDJSON registry data with COPY")
+    parser.add_argument("table", choices=sorted(SPECS))
+    parser.add_argument("source", help="CSV with a header line or NDJSON file")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="default: by file extension")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint of this source")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.source.lower().endswith(".csv") else "ndjson")
+    asyncio.run(load(args.table, args.source, fmt, args.batch_size, args.restart))
+
+
+if __name__ == "__main__":
+    main()
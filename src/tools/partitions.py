@@ -0,0 +1,35 @@
+"""
+Partition maintenance for the yearly partitions of Patent and Application
+
+    python -m src.tools.partitions --years-ahead 3 --retain-years 30 --dry-run
+
+The API runs the same maintenance every DB_PARTITION_MAINTENANCE_INTERVAL seconds.
+"""
+import argparse
+import asyncio
+from src.db.database import engine
+from src.db.partitions import maintain_partitions, DB_PARTITION_YEARS_AHEAD, DB_PARTITION_RETAIN_YEARS
+
+
+async def run(years_ahead: int, retain_years: int, dry_run: bool):
+    async with engine.begin() as conn:
+        statements = await maintain_partitions(conn, years_ahead, retain_years, dry_run)
+    await engine.dispose()
+    for statement in statements:
+        print(statement)
+    if not statements:
+        print("Nothing to do")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create future partitions and detach old ones")
+    parser.add_argument("--years-ahead", type=int, default=DB_PARTITION_YEARS_AHEAD)
+    parser.add_argument("--retain-years", type=int, default=DB_PARTITION_RETAIN_YEARS,
+                        help="detach partitions older than this many years, 0 keeps all")
+    parser.add_argument("--dry-run", action="store_true", help="print the statements without running them")
+    args = parser.parse_args()
+    asyncio.run(run(args.years_ahead, args.retain_years, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Tests that need PostgreSQL run against a migrated scratch database:
+
+    alembic upgrade head
+    TEST_DATABASE_URL=postgresql+asyncpg://postgres@localhost/patent_test python -m pytest
+
+Without TEST_DATABASE_URL they are skipped
+"""
+import json
+import os
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    # src.db.database reads DATABASE_URL on import
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+requires_database = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def engine():
+    from src.db.database import engine
+    yield engine
+    # Pooled connections belong to this test's event loop
+    await engine.dispose()
+
+
+async def asgi_request(
+    app, method: str, path: str, body=None, headers: dict = None, content: bytes = None
+) -> tuple[int, dict]:
+    """Send one request straight to the ASGI app, returns status and decoded JSON body"""
+    if content is not None:
+        raw_body, raw_headers = content, []
+    elif body is not None:
+        raw_body, raw_headers = json.dumps(body).encode(), [(b"content-type", b"application/json")]
+    else:
+        raw_body, raw_headers = b"", []
+    raw_headers += [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()]
+    scope = {
+        "type": "http", "method": method, "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": raw_headers, "client": ("127.0.0.1", 50000), "server": ("test", 80),
+        "scheme": "http", "http_version": "1.1", "root_path": "",
+    }
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            return {"type": "http.disconnect"}
+        received = True
+        return {"type": "http.request", "body": raw_body, "more_body": False}
+
+    response = {"status": None, "body": b""}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response["status"], json.loads(response["body"] or b"null")
@@ -0,0 +1,34 @@
+import uuid
+import pytest
+from sqlalchemy import delete, select
+from tests.conftest import asgi_request, requires_database
+
+pytestmark = [requires_database, pytest.mark.anyio]
+
+
+async def test_registered_user_can_read_me(engine):
+    from src.main import app
+    from src.models.models import Author, User
+
+    name = f"test_{uuid.uuid4().hex[:12]}"
+    status, tokens = await asgi_request(app, "POST", "/auth/register", {
+        "email": f"{name}@example.com",
+        "username": name,
+        "password": "correct horse battery staple",
+        "user_type": "author",
+        "full_name": "Test Author",
+    })
+    try:
+        assert status == 200, tokens
+        status, me = await asgi_request(
+            app, "GET", "/auth/me", headers={"authorization": f"Bearer {tokens['access_token']}"}
+        )
+        assert status == 200, me
+        assert me["username"] == name
+        assert me["created_at"] is not None
+    finally:
+        async with engine.begin() as conn:
+            author_id = await conn.scalar(select(User.author_id).where(User.username == name))
+            await conn.execute(delete(User).where(User.username == name))
+            if author_id is not None:
+                await conn.execute(delete(Author).where(Author.id == author_id))
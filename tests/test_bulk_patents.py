@@ -0,0 +1,30 @@
+import uuid
+import pytest
+from sqlalchemy import delete, select, func
+from tests.conftest import requires_database
+
+pytestmark = [requires_database, pytest.mark.anyio]
+
+
+async def test_out_of_range_value_is_reported_as_row_error(engine):
+    from src.db.database import SessionLocal
+    from src.db.crud.patent import bulk_create_patents
+    from src.models.models import Application, Patent
+
+    title = f"test_{uuid.uuid4().hex[:12]}"
+    async with engine.connect() as conn:
+        application_id = await conn.scalar(select(func.min(Application.id)))
+    if application_id is None:
+        pytest.skip("needs at least one Application row")
+
+    try:
+        async with SessionLocal() as session:
+            results = await bulk_create_patents(session, [
+                {"title": title, "application_id": application_id, "patent_type_id": 2 ** 31},
+                {"title": title, "application_id": application_id},
+            ])
+        assert "error" in results[0] and "int32" in results[0]["error"]
+        assert "id" in results[1]
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(delete(Patent).where(Patent.title == title))
@@ -0,0 +1,61 @@
+import json
+import uuid
+import pytest
+from sqlalchemy import delete, select
+from tests.conftest import asgi_request, requires_database
+
+pytestmark = [requires_database, pytest.mark.anyio]
+
+
+def _line(username: str) -> bytes:
+    return json.dumps({
+        "email": f"{username}@example.com", "username": username, "password": "secret",
+        "user_type": "author", "full_name": "Bulk Author",
+    }).encode()
+
+
+async def test_bulk_register_reports_every_row(engine, monkeypatch):
+    from src.main import app
+    from src.api import auth
+    from src.api.depends import get_employee_user
+    from src.core.security import PasswordHasherBusy
+    from src.db.crud import user as user_crud
+    from src.models.models import Author, User
+
+    hashed_batches = []
+    real_hash = user_crud.hash_passwords_async
+
+    async def hash_passwords(passwords):
+        hashed_batches.append(len(passwords))
+        if len(hashed_batches) > 1:
+            raise PasswordHasherBusy()
+        return await real_hash(passwords)
+
+    monkeypatch.setattr(user_crud, "hash_passwords_async", hash_passwords)
+    monkeypatch.setattr(auth, "USER_BULK_BATCH_SIZE", 3)
+    app.dependency_overrides[get_employee_user] = lambda: None
+
+    prefix = f"bulk_{uuid.uuid4().hex[:8]}"
+    body = b"\n".join([
+        _line(f"{prefix}_a"), _line(f"{prefix}_a"), b'{"username": "\xff\xfe"}',
+        _line(f"{prefix}_b"), _line(f"{prefix}_c"), _line(f"{prefix}_d"),
+    ])
+    try:
+        status, report = await asgi_request(app, "POST", "/auth/users/bulk", content=body)
+        assert status == 200, report
+        errors = {item["row"]: item.get("error") for item in report["results"]}
+        assert errors[1] is None
+        assert errors[2] == "Username already registered"
+        assert errors[3] == "Line is not valid UTF-8"
+        assert all(errors[row] == "Server is busy, batch not processed" for row in (4, 5, 6))
+        assert (report["created"], report["failed"]) == (1, 5)
+        # The duplicate was rejected before hashing
+        assert hashed_batches == [1, 3]
+    finally:
+        app.dependency_overrides.pop(get_employee_user, None)
+        async with engine.begin() as conn:
+            author_ids = (await conn.scalars(
+                select(User.author_id).where(User.username.like(f"{prefix}%"))
+            )).all()
+            await conn.execute(delete(User).where(User.username.like(f"{prefix}%")))
+            await conn.execute(delete(Author).where(Author.id.in_(author_ids)))
@@ -0,0 +1,12 @@
+import pytest
+from tests.conftest import asgi_request
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("path", ["/metrics/password-hash", "/metrics/db-pool"])
+async def test_metrics_require_authentication(path):
+    from src.main import app
+
+    status, body = await asgi_request(app, "GET", path)
+    assert status == 401, body
@@ -0,0 +1,21 @@
+import os
+import pytest
+from tests.conftest import requires_database
+
+pytestmark = [requires_database, pytest.mark.anyio]
+
+# Enough rows that the planner prefers the indexes, see src/tools/check_plans.py
+PLAN_CHECK_ROWS = int(os.getenv("PLAN_CHECK_ROWS", 50000))
+
+
+async def test_hot_queries_use_indexes(engine):
+    from src.tools.check_plans import seq_scans_of_hot_queries
+
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            plans = await seq_scans_of_hot_queries(conn, PLAN_CHECK_ROWS)
+        finally:
+            await transaction.rollback()
+
+    assert {name: scans for name, (_, scans) in plans.items() if scans} == {}
@@ -0,0 +1,33 @@
+import asyncio
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_timed_out_hash_keeps_its_slot_until_the_worker_finishes():
+    from src.core import security
+
+    with pytest.raises(security.PasswordHasherBusy):
+        await security._run_in_hash_pool(security.hash_password, "password", timeout=0.001)
+    assert security._hash_pending == 1
+
+    for _ in range(200):
+        if security._hash_pending == 0:
+            break
+        await asyncio.sleep(0.05)
+    assert security._hash_pending == 0
+
+
+@pytest.mark.parametrize("keys, active_kid", [({}, "2026-01"), ({"2026-01": "pem"}, "2025-12")])
+def test_unusable_active_kid_fails_at_startup(keys, active_kid):
+    from src.core.security import _select_active_kid
+
+    with pytest.raises(RuntimeError, match="JWT_ACTIVE_KID"):
+        _select_active_kid(keys, active_kid)
+
+
+def test_active_kid_defaults_to_newest_key():
+    from src.core.security import _select_active_kid
+
+    assert _select_active_kid({"2025-12": "pem", "2026-01": "pem"}, None) == "2026-01"
+    assert _select_active_kid({}, None) is None
@@ -0,0 +1,36 @@
+import asyncio
+import pytest
+from src.core.throttle import MemoryThrottleBackend, SQLiteThrottleBackend, SlidingWindowLimiter
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def limiter(request, tmp_path):
+    if request.param == "sqlite":
+        backend = SQLiteThrottleBackend(str(tmp_path / "throttle.sqlite3"))
+    else:
+        backend = MemoryThrottleBackend()
+    return SlidingWindowLimiter(backend, window=300)
+
+
+async def test_concurrent_attempts_are_counted_one_by_one(limiter):
+    refused = await asyncio.gather(*[limiter.acquire("user:alice", 5) for _ in range(200)])
+    assert sum(retry_after is None for retry_after in refused) == 5
+
+
+async def test_release_gives_back_one_attempt(limiter):
+    for _ in range(3):
+        assert await limiter.acquire("ip:10.0.0.1", 3) is None
+    assert await limiter.acquire("ip:10.0.0.1", 3) is not None
+    await limiter.release("ip:10.0.0.1")
+    assert await limiter.acquire("ip:10.0.0.1", 3) is None
+
+
+async def test_sqlite_prunes_expired_attempts_of_every_key(tmp_path):
+    backend = SQLiteThrottleBackend(str(tmp_path / "throttle.sqlite3"))
+    await backend.acquire("user:old", now=100.0, since=0.0, limit=5)
+    await backend.acquire("user:new", now=1000.0, since=700.0, limit=5)
+    with backend._connect() as conn:
+        keys = [key for key, in conn.execute("SELECT key FROM attempts")]
+    assert keys == ["user:new"]